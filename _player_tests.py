@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the playback engine. Like keyboard/_keyboard_tests.py, the OS
+keyboard backend is replaced with fakes for the duration of each test, so
+key names map to made-up scan codes and injected keys are only recorded.
+"""
+import os
+import shutil
+import tempfile
+import itertools
+import unittest
+from array import array
+
+import keyboard
+import player
+
+# Scan codes of the fake backend: the 21 layout keys, then the modifiers.
+dummy_keys = {name: [(i + 10, ())] for i, name in enumerate(sum(player.ROW_KEYS, []))}
+dummy_keys.update({
+    'left shift': [(1, ())],
+    'right shift': [(2, ())],
+    'left ctrl': [(3, ())],
+    'right ctrl': [(4, ())],
+})
+SHIFT = 1
+CTRL = 3
+def code(key):
+    return dummy_keys[key][0][0]
+
+def make_song(notes, length=None):
+    """ Builds a Song from (time, note) pairs, all on track 0, channel 0. """
+    times = array('d', [t for t, _ in notes])
+    return player.Song(times, array('B', [n for _, n in notes]), array('B', [0] * len(notes)),
+                       array('H', [0] * len(notes)), length if length is not None else (times[-1] if notes else 0.0))
+
+class InstantScheduler(player.Scheduler):
+    """ A Scheduler whose clock jumps past every deadline, so nothing waits. """
+    def __init__(self):
+        player.Scheduler.__init__(self, spin=0, clock=itertools.count(0, 1000).__next__)
+
+class TestPlayer(unittest.TestCase):
+    def setUp(self):
+        self.events = []
+        self.backend = {name: getattr(keyboard._os_keyboard, name) for name in ('map_name', 'press', 'release')}
+        keyboard._os_keyboard.map_name = dummy_keys.__getitem__
+        keyboard._os_keyboard.press = lambda scan_code: self.events.append(('d', scan_code))
+        keyboard._os_keyboard.release = lambda scan_code: self.events.append(('u', scan_code))
+        player._scan_codes.clear()
+
+    def tearDown(self):
+        for name, value in self.backend.items():
+            setattr(keyboard._os_keyboard, name, value)
+        player._scan_codes.clear()
+
+    def play(self, timeline):
+        player.play_timeline(timeline, lambda: False, scheduler=InstantScheduler())
+
+    def test_best_transpose_no_shift(self):
+        histogram = player.pitch_histogram([60, 62, 64])
+        self.assertEqual(player.best_transpose(histogram), 0)
+    def test_best_transpose_avoids_modifiers(self):
+        # C# can become C (-1) or D (+1), the smaller shift wins the tie.
+        self.assertEqual(player.best_transpose(player.pitch_histogram([61])), -1)
+    def test_best_transpose_drops_first(self):
+        # Lowest shift that brings the note onto the layout, on a natural.
+        self.assertEqual(player.best_transpose(player.pitch_histogram([30])), 18)
+
+    def test_timeline_chords(self):
+        # C, C# and E at once: natural keys first, one entry per key.
+        timeline = player.Timeline(make_song([(0, 48), (0, 49), (0, 52), (0, 52), (1, 48)]))
+        self.assertEqual(list(timeline.times), [0, 0, 0, 1])
+        self.assertEqual(list(timeline.scan_codes), [code('z'), code('c'), code('z'), code('z')])
+        self.assertEqual(list(timeline.modifiers), [0, 0, 1, 0])
+
+    def test_recompile_speed_keeps_position(self):
+        song = make_song([(t, 60) for t in range(6)])
+        timeline = player.Timeline(song)
+        timeline.recompile(3, speed=2.0)
+        self.assertEqual(list(timeline.times), [0, 1, 2, 2.5, 3, 3.5])
+        self.assertEqual(list(timeline.sources), [0, 1, 2, 3, 4, 5])
+
+    def test_recompile_skips_played_chord(self):
+        song = make_song([(0, 60), (1, 60), (1, 64), (1, 67), (2, 60), (3, 60)])
+        timeline = player.Timeline(song)
+        # The chord at 1s is three actions (indexes 1-3); resume after it.
+        timeline.recompile(4, transpose=12, speed=0.5)
+        self.assertEqual(list(timeline.sources)[4:], [4, 5])
+        self.assertEqual(list(timeline.times)[4:], [3, 5])
+        self.assertEqual(list(timeline.scan_codes)[:4], [code('a'), code('a'), code('d'), code('g')])
+        self.assertEqual(list(timeline.scan_codes)[4:], [code('q'), code('q')])
+
+    def test_thinner_rate(self):
+        song = make_song([(i * 0.1, 48 + (i % 3) * 2) for i in range(30)])
+        timeline = player.Timeline(song, max_rate=4)
+        times = list(timeline.times)
+        self.assertTrue(times)
+        for i, t in enumerate(times):
+            self.assertLessEqual(sum(1 for other in times[i:] if other < t + 1.0), 4)
+
+    def test_thinner_top_voice(self):
+        song = make_song([(0, 60), (0, 64), (0, 67), (2, 60), (2, 64), (2, 67)])
+        timeline = player.Timeline(song, max_rate=1)
+        self.assertEqual(list(timeline.sources), [2, 5])
+
+    def test_thinner_repeat_window(self):
+        song = make_song([(0, 60), (0.01, 60), (0.05, 60), (0.06, 62)])
+        timeline = player.Timeline(song, repeat_window=0.03)
+        self.assertEqual(list(timeline.sources), [0, 2, 3])
+
+    def test_play_holds_modifier(self):
+        # C#, F#: both shifted, shift is held across them.
+        self.play(player.Timeline(make_song([(0, 49), (0.1, 54)])))
+        self.assertEqual(self.events, [('d', SHIFT), ('d', code('z')), ('u', code('z')),
+                                       ('d', code('v')), ('u', code('v')), ('u', SHIFT)])
+
+    def test_play_releases_for_natural_and_other_modifier(self):
+        # C#, C, Eb: shift, nothing, ctrl.
+        self.play(player.Timeline(make_song([(0, 49), (0.1, 48), (0.2, 51)])))
+        self.assertEqual(self.events, [('d', SHIFT), ('d', code('z')), ('u', code('z')), ('u', SHIFT),
+                                       ('d', code('z')), ('u', code('z')),
+                                       ('d', CTRL), ('d', code('c')), ('u', code('c')), ('u', CTRL)])
+
+    def test_play_releases_before_long_gap(self):
+        gap = player.MODIFIER_HOLD_LIMIT + 1
+        self.play(player.Timeline(make_song([(0, 58), (gap, 58)])))
+        self.assertEqual(self.events, [('d', CTRL), ('d', code('m')), ('u', code('m')), ('u', CTRL)] * 2)
+
+    def test_play_held_group_first(self):
+        # After C#, the chord C + F# plays its shifted key first.
+        self.play(player.Timeline(make_song([(0, 49), (0.1, 48), (0.1, 54)])))
+        self.assertEqual(self.events, [('d', SHIFT), ('d', code('z')), ('u', code('z')),
+                                       ('d', code('v')), ('u', code('v')), ('u', SHIFT),
+                                       ('d', code('z')), ('u', code('z'))])
+
+    def test_play_stop_releases(self):
+        calls = []
+        def should_stop():
+            calls.append(True)
+            return len(calls) > 1
+        timeline = player.Timeline(make_song([(0, 49), (0.1, 54)]))
+        player.play_timeline(timeline, should_stop, scheduler=InstantScheduler())
+        self.assertEqual(self.events, [('d', SHIFT), ('d', code('z')), ('u', code('z')), ('u', SHIFT)])
+
+    def test_song_from_midi(self):
+        import mido
+        midi = mido.MidiFile(ticks_per_beat=480)
+        for channel, notes in ((0, [60, 64]), (9, [36])):
+            track = mido.MidiTrack()
+            track.append(mido.MetaMessage('set_tempo', tempo=500000))
+            for note in notes:
+                track.append(mido.Message('note_on', note=note, velocity=64, channel=channel, time=480))
+                track.append(mido.Message('note_on', note=note, velocity=0, channel=channel, time=240))
+            midi.tracks.append(track)
+        song = player.Song.from_midi(midi)
+        self.assertEqual(list(song.times), [0.5, 0.5, 1.25])
+        self.assertEqual(list(song.notes), [60, 36, 64])
+        self.assertEqual(list(song.channels), [0, 9, 0])
+        self.assertEqual(list(song.tracks), [0, 1, 0])
+
+    def test_song_cache_round_trip(self):
+        directory = tempfile.mkdtemp()
+        old_cache_dir = player.CACHE_DIR
+        player.CACHE_DIR = directory
+        try:
+            song = make_song([(0, 60), (0.5, 64), (0.5, 67), (1.25, 72)], length=2.0)
+            song.channels[1] = 9
+            song.tracks[3] = 2
+            path = os.path.join(directory, 'song.song')
+            player._write_cached_song(path, song)
+            cached = player._read_cached_song(path)
+            self.assertEqual(list(cached.times), list(song.times))
+            self.assertEqual(list(cached.notes), list(song.notes))
+            self.assertEqual(list(cached.channels), list(song.channels))
+            self.assertEqual(list(cached.tracks), list(song.tracks))
+            self.assertEqual(cached.length, 2.0)
+        finally:
+            player.CACHE_DIR = old_cache_dir
+            shutil.rmtree(directory)
+
+    def test_song_cache_stale(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'song.song')
+            with open(path, 'wb') as file:
+                file.write(player._CACHE_HEADER.pack(b'XXXX', player.CACHE_VERSION, 0, 0.0))
+            self.assertRaises(ValueError, player._read_cached_song, path)
+        finally:
+            shutil.rmtree(directory)
+
+class TestLibrary(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'library.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def session(self, paths):
+        """ Opens the library, adds `paths`, waits for the refreshes and closes it. """
+        library = player.Library(self.filename)
+        library.add(paths)
+        library.executor.shutdown(wait=True)
+        library.close()
+        return library
+
+    def test_library_round_trip(self):
+        # The files don't exist, so their entries stay without metadata.
+        self.session(['f001.mid', 'f002.mid'])
+        self.assertEqual(player.Library(self.filename).paths(), ['f001.mid', 'f002.mid'])
+        self.session(['f003.mid'])
+        self.assertEqual(player.Library(self.filename).paths(), ['f001.mid', 'f002.mid', 'f003.mid'])
+
+    def test_library_clear(self):
+        self.session(['f001.mid'])
+        player.Library(self.filename).clear()
+        self.assertEqual(player.Library(self.filename).paths(), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -144,8 +144,30 @@ def is_modifier(key):
             _modifier_scan_codes.update(*scan_codes)
         return key in _modifier_scan_codes
 
+class _PressedEvents(dict):
+    """
+    Scan code -> KEY_DOWN event of the keys currently pressed. The sorted
+    tuple of the scan codes, which is how hotkeys are looked up, is kept in
+    `key` and only rebuilt when a key goes down or up, not on key repeats.
+    """
+    key = ()
+
+    def __setitem__(self, scan_code, event):
+        is_new = scan_code not in self
+        dict.__setitem__(self, scan_code, event)
+        if is_new:
+            self.key = tuple(sorted(self))
+
+    def __delitem__(self, scan_code):
+        dict.__delitem__(self, scan_code)
+        self.key = tuple(sorted(self))
+
+    def clear(self):
+        dict.clear(self)
+        self.key = ()
+
 _pressed_events_lock = _Lock()
-_pressed_events = {}
+_pressed_events = _PressedEvents()
 _physically_pressed_keys = _pressed_events
 _logically_pressed_keys = {}
 class _KeyboardListener(_GenericListener):
@@ -209,12 +231,10 @@ class _KeyboardListener(_GenericListener):
         self.modifier_states = {} # "alt" -> "allowed"
 
     def pre_process_event(self, event):
-        for key_hook in self.nonblocking_keys[event.scan_code]:
+        for key_hook in self.nonblocking_keys.get(event.scan_code, ()):
             key_hook(event)
 
-        with _pressed_events_lock:
-            hotkey = tuple(sorted(_pressed_events))
-        for callback in self.nonblocking_hotkeys[hotkey]:
+        for callback in self.nonblocking_hotkeys.get(_pressed_events.key, ()):
             callback(event)
 
         return event.scan_code or (event.name and event.name != 'unknown')
@@ -233,24 +253,26 @@ class _KeyboardListener(_GenericListener):
         if self.is_replaying:
             return True
 
-        if not all(hook(event) for hook in self.blocking_hooks):
-            return False
+        for hook in self.blocking_hooks:
+            if not hook(event):
+                return False
 
         event_type = event.event_type
         scan_code = event.scan_code
 
-        # Update tables of currently pressed keys and modifiers.
+        # Update tables of currently pressed keys and modifiers. Lookups
+        # below use `get` so that unhooked keys don't add empty entries.
         with _pressed_events_lock:
             if event_type == KEY_DOWN:
                 if is_modifier(scan_code): self.active_modifiers.add(scan_code)
                 _pressed_events[scan_code] = event
-            hotkey = tuple(sorted(_pressed_events))
+            hotkey = _pressed_events.key
             if event_type == KEY_UP:
                 self.active_modifiers.discard(scan_code)
                 if scan_code in _pressed_events: del _pressed_events[scan_code]
 
         # Mappings based on individual keys instead of hotkeys.
-        for key_hook in self.blocking_keys[scan_code]:
+        for key_hook in self.blocking_keys.get(scan_code, ()):
             if not key_hook(event):
                 return False
 
@@ -265,9 +287,9 @@ class _KeyboardListener(_GenericListener):
                 modifiers_to_update = self.active_modifiers
                 if is_modifier(scan_code):
                     modifiers_to_update = modifiers_to_update | {scan_code}
-                callback_results = [callback(event) for callback in self.blocking_hotkeys[hotkey]]
-                if callback_results:
-                    accept = all(callback_results)
+                callbacks = self.blocking_hotkeys.get(hotkey)
+                if callbacks:
+                    accept = all([callback(event) for callback in callbacks])
                     origin = 'hotkey'
                 else:
                     origin = 'other'
@@ -325,6 +347,19 @@ def key_to_scan_codes(key, error_if_missing=True):
     else:
         return t
 
+def refresh_key_names():
+    """
+    Rebuilds the OS key name tables instead of using the copy saved by an
+    earlier run, and saves them again. The saved copy is matched to the
+    keymap or keyboard layout, so this is only needed if a change to them
+    went unnoticed.
+    """
+    _os_keyboard.refresh_tables()
+    _parse_hotkey_cache.clear()
+
+# Most recently used string hotkeys and their parsed form, oldest first.
+_parse_hotkey_cache = _collections.OrderedDict()
+_parse_hotkey_cache_size = 256
 def parse_hotkey(hotkey):
     """
     Parses a user-provided hotkey into nested tuples representing the
@@ -339,7 +374,25 @@ def parse_hotkey(hotkey):
         #    Steps:   ^~~~~~~~~~^  ^~~~^  ^
 
         # ((alt_codes, shift_codes, a_codes), (alt_codes, b_codes), (c_codes,))
+
+    String hotkeys are cached, so parsing the same hotkey again is a lookup.
     """
+    if not _is_str(hotkey):
+        return _parse_hotkey(hotkey)
+
+    try:
+        steps = _parse_hotkey_cache.pop(hotkey)
+    except KeyError:
+        steps = _parse_hotkey(hotkey)
+        while len(_parse_hotkey_cache) >= _parse_hotkey_cache_size:
+            try:
+                _parse_hotkey_cache.popitem(last=False)
+            except KeyError:
+                break
+    _parse_hotkey_cache[hotkey] = steps
+    return steps
+
+def _parse_hotkey(hotkey):
     if _is_number(hotkey) or len(hotkey) == 1:
         scan_codes = key_to_scan_codes(hotkey)
         step = (scan_codes,)
@@ -391,6 +444,108 @@ def send(hotkey, do_press=True, do_release=True):
 # Alias.
 press_and_release = send
 
+class _HotkeyPlan(object):
+    """
+    A hotkey resolved to the scan codes that `send` would press and release,
+    step by step. Made by `compile_hotkey`.
+    """
+    __slots__ = ('steps',)
+
+    def __init__(self, parsed):
+        # Only the first scan code of each key is sent.
+        self.steps = tuple((tuple(scan_codes[0] for scan_codes in step),
+                            tuple(scan_codes[0] for scan_codes in reversed(step)))
+                           for step in parsed)
+
+    def __repr__(self):
+        return '_HotkeyPlan({})'.format(tuple(presses for presses, releases in self.steps))
+
+def compile_hotkey(hotkey):
+    """
+    Resolves a hotkey (anything `send` accepts) into scan codes once, and
+    returns a plan that `send_plan` can replay any number of times without
+    parsing names again.
+
+        plan = compile_hotkey('shift+z')
+        for i in range(100):
+            send_plan(plan)
+    """
+    return _HotkeyPlan(parse_hotkey(hotkey))
+
+def send_plan(plan, do_press=True, do_release=True):
+    """
+    Sends the OS events of a plan from `compile_hotkey`. Same as `send` for
+    the original hotkey, but only the OS press/release calls are made.
+    """
+    _listener.is_replaying = True
+
+    press = _os_keyboard.press
+    release = _os_keyboard.release
+    for presses, releases in plan.steps:
+        if do_press:
+            for scan_code in presses:
+                press(scan_code)
+
+        if do_release:
+            for scan_code in releases:
+                release(scan_code)
+
+    _listener.is_replaying = False
+
+class ModifierSequencer(object):
+    """
+    Taps keys under modifiers, keeping the modifiers held between taps that
+    need the same ones. A run of shifted keys then costs one shift press and
+    one shift release instead of one of each per key. Modifiers are released
+    only when a tap needs different ones, or by `release_modifiers`, which
+    must be called when done.
+
+    Keys and modifiers can be names or scan codes.
+
+        sequencer = ModifierSequencer()
+        sequencer.tap('a', ['shift']) # Presses shift, taps a.
+        sequencer.tap('b', ['shift']) # Taps b, shift is still held.
+        sequencer.tap('c')            # Releases shift, taps c.
+        sequencer.release_modifiers()
+    """
+    def __init__(self):
+        self.held = ()
+
+    def _resolve(self, keys):
+        return tuple(key if _is_number(key) else key_to_scan_codes(key)[0] for key in keys)
+
+    def tap(self, keys, modifiers=()):
+        """
+        Presses and releases `keys` (one key or a list, pressed together)
+        with exactly `modifiers` held.
+        """
+        keys = self._resolve((keys,) if _is_str(keys) or _is_number(keys) else keys)
+        modifiers = self._resolve(modifiers)
+
+        _listener.is_replaying = True
+        if modifiers != self.held:
+            for scan_code in reversed(self.held):
+                if scan_code not in modifiers:
+                    _os_keyboard.release(scan_code)
+            for scan_code in modifiers:
+                if scan_code not in self.held:
+                    _os_keyboard.press(scan_code)
+            self.held = modifiers
+
+        for scan_code in keys:
+            _os_keyboard.press(scan_code)
+        for scan_code in reversed(keys):
+            _os_keyboard.release(scan_code)
+        _listener.is_replaying = False
+
+    def release_modifiers(self):
+        """ Releases the modifiers held from the last tap, if any. """
+        _listener.is_replaying = True
+        for scan_code in reversed(self.held):
+            _os_keyboard.release(scan_code)
+        self.held = ()
+        _listener.is_replaying = False
+
 def press(hotkey):
     """ Presses and holds down a hotkey (see `send`). """
     send(hotkey, True, False)
@@ -750,6 +905,141 @@ def remove_hotkey(hotkey_or_callback):
     _hotkeys[hotkey_or_callback]()
 unregister_hotkey = clear_hotkey = remove_hotkey
 
+class _HotkeyNode(object):
+    __slots__ = ('children', 'callback')
+
+    def __init__(self):
+        # Sorted tuple of pressed scan codes -> next node.
+        self.children = {}
+        self.callback = None
+
+class HotkeyMatcher(object):
+    """
+    Dispatches many hotkeys from a single hook. The hotkeys are compiled into
+    a trie keyed by the sorted tuple of scan codes pressed at each step (see
+    `parse_hotkey_combinations`), so a key press costs one dictionary lookup
+    however many hotkeys are registered. A multi-step hotkey advances one
+    node per step; a press that matches nothing, or comes more than
+    `timeout` seconds after the last step, starts over from the first step.
+    Modifiers pressed on their own don't break a sequence.
+
+    Hotkeys trigger on key down and callbacks take no arguments. With
+    `suppress=True` the press that triggers a hotkey, and its release, are
+    blocked, and callbacks run in the OS hook like `add_hotkey` with
+    `suppress=True`. Other keys, including the earlier steps and the
+    modifiers of a hotkey, always go through.
+
+        matcher = HotkeyMatcher(suppress=True)
+        matcher.add_hotkeys({'f5': toggle, 'ctrl+s, q': save_and_quit})
+        matcher.start()
+        ...
+        matcher.remove_hotkeys(['f5'])
+        matcher.stop()
+    """
+    def __init__(self, suppress=False, timeout=1):
+        self.suppress = suppress
+        self.timeout = timeout
+        self._steps = {}
+        self._callbacks = {}
+        self._root = self._node = _HotkeyNode()
+        self._last_update = float('-inf')
+        self._suppressed = set()
+        self._remove_hook = None
+
+    def _insert(self, root, steps, callback):
+        nodes = [root]
+        for step in steps:
+            nodes = [node.children.setdefault(scan_codes, _HotkeyNode()) for node in nodes for scan_codes in step]
+        for node in nodes:
+            node.callback = callback
+
+    def add_hotkeys(self, hotkeys):
+        """
+        Registers the hotkeys of a `{hotkey: callback}` dictionary, replacing
+        the callback of any already registered. Raises ValueError, and
+        registers none, if a hotkey can't be parsed.
+        """
+        parsed = [(hotkey, parse_hotkey_combinations(hotkey), callback) for hotkey, callback in hotkeys.items()]
+        replaced = any(hotkey in self._steps for hotkey, _, _ in parsed)
+        for hotkey, steps, callback in parsed:
+            self._steps[hotkey] = steps
+            self._callbacks[hotkey] = callback
+            if not replaced:
+                self._insert(self._root, steps, callback)
+        if replaced:
+            self._rebuild()
+
+    def remove_hotkeys(self, hotkeys):
+        """
+        Unregisters the given hotkeys. Raises KeyError, and unregisters none,
+        if one of them is not registered.
+        """
+        hotkeys = list(hotkeys)
+        for hotkey in hotkeys:
+            if hotkey not in self._steps:
+                raise KeyError(hotkey)
+        for hotkey in hotkeys:
+            del self._steps[hotkey]
+            del self._callbacks[hotkey]
+        self._rebuild()
+
+    def _rebuild(self):
+        root = _HotkeyNode()
+        for hotkey, steps in self._steps.items():
+            self._insert(root, steps, self._callbacks[hotkey])
+        self._root = self._node = root
+
+    def _on_event(self, event):
+        scan_code = event.scan_code
+        if event.event_type == KEY_UP:
+            if scan_code in self._suppressed:
+                self._suppressed.discard(scan_code)
+                return False
+            return True
+
+        # Blocking hooks run before the key is added to the pressed keys.
+        hotkey = _pressed_events.key
+        if scan_code not in _pressed_events:
+            hotkey = tuple(sorted(hotkey + (scan_code,)))
+
+        root = self._root
+        node = self._node
+        if node is not root and self.timeout and _time.monotonic() - self._last_update >= self.timeout:
+            node = root
+        child = node.children.get(hotkey)
+        if child is None and node is not root:
+            child = root.children.get(hotkey)
+        if child is None:
+            if not is_modifier(scan_code):
+                self._node = root
+            return True
+
+        if child.children:
+            self._node = child
+            self._last_update = _time.monotonic()
+        else:
+            self._node = root
+        if child.callback is None:
+            return True
+        child.callback()
+        if self.suppress:
+            self._suppressed.add(scan_code)
+            return False
+        return True
+
+    def start(self):
+        """ Starts matching key events. """
+        if self._remove_hook is None:
+            self._remove_hook = hook(self._on_event, suppress=self.suppress)
+
+    def stop(self):
+        """ Stops matching key events. Registered hotkeys are kept. """
+        if self._remove_hook is not None:
+            self._remove_hook()
+            self._remove_hook = None
+        self._node = self._root
+        self._suppressed.clear()
+
 def unhook_all_hotkeys():
     """
     Removes all keyboard hotkeys in use, including abbreviations, word listeners,
@@ -408,6 +408,10 @@ key_controller = KeyController()
 def init():
     key_controller = KeyController()
 
+def refresh_tables():
+    """ Key names are looked up as needed, there are no tables to rebuild """
+    pass
+
 def press(scan_code):
     """ Sends a 'down' event for the specified scan code """
     key_controller.press(scan_code)
@@ -12,14 +12,23 @@ except NameError:
 KEY_DOWN = 'down'
 KEY_UP = 'up'
 
+# Raw name -> normalized name. The same few names come with every event, so
+# each is normalized once and its events share one string.
+_normalized_names = {}
+_normalized_names_size = 4096
+
+def _normalize_event_name(name):
+    try:
+        return _normalized_names[name]
+    except (KeyError, TypeError):
+        pass
+    normalized = normalize_name(name)
+    if len(_normalized_names) < _normalized_names_size:
+        _normalized_names[name] = normalized
+    return normalized
+
 class KeyboardEvent(object):
-    event_type = None
-    scan_code = None
-    name = None
-    time = None
-    device = None
-    modifiers = None
-    is_keypad = None
+    __slots__ = ('event_type', 'scan_code', 'name', 'time', 'device', 'modifiers', 'is_keypad')
 
     def __init__(self, event_type, scan_code, name=None, time=None, device=None, modifiers=None, is_keypad=None):
         self.event_type = event_type
@@ -28,8 +37,7 @@ class KeyboardEvent(object):
         self.device = device
         self.is_keypad = is_keypad
         self.modifiers = modifiers
-        if name:
-            self.name = normalize_name(name)
+        self.name = _normalize_event_name(name) if name else None
 
     def to_json(self, ensure_ascii=False):
         attrs = dict(
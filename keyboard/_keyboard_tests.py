@@ -266,6 +266,94 @@ class TestKeyboard(unittest.TestCase):
         keyboard.send('ctrl+shift+a', do_press=False, do_release=True)
         self.do([], u_a+u_shift+u_ctrl)
 
+    def test_compile_hotkey_send_plan(self):
+        keyboard.send_plan(keyboard.compile_hotkey('ctrl+a, b'))
+        self.do([], d_ctrl+d_a+u_a+u_ctrl+d_b+u_b)
+    def test_send_plan_press(self):
+        keyboard.send_plan(keyboard.compile_hotkey('ctrl+shift+a'), do_press=True, do_release=False)
+        self.do([], d_ctrl+d_shift+d_a)
+    def test_send_plan_release(self):
+        keyboard.send_plan(keyboard.compile_hotkey('ctrl+shift+a'), do_press=False, do_release=True)
+        self.do([], u_a+u_shift+u_ctrl)
+    def test_send_plan_scan_codes(self):
+        keyboard.send_plan(keyboard.compile_hotkey([1, 2]))
+        self.do([], d_a+d_b+u_b+u_a)
+    def test_parse_hotkey_cached(self):
+        self.assertIs(keyboard.parse_hotkey('a+b'), keyboard.parse_hotkey('a+b'))
+    def test_event_slots(self):
+        event = KeyboardEvent(KEY_DOWN, 1, name='Left_Control')
+        self.assertFalse(hasattr(event, '__dict__'))
+        self.assertEqual(event.name, 'left ctrl')
+        self.assertIs(KeyboardEvent(KEY_UP, 1, name='Left_Control').name, event.name)
+        self.assertIsNone(KeyboardEvent(KEY_UP, 1).name)
+
+    def test_refresh_key_names(self):
+        refreshed = []
+        old_refresh_tables = keyboard._os_keyboard.refresh_tables
+        keyboard._os_keyboard.refresh_tables = lambda: refreshed.append(True)
+        try:
+            parsed = keyboard.parse_hotkey('a+b')
+            keyboard.refresh_key_names()
+            self.assertEqual(refreshed, [True])
+            self.assertIsNot(keyboard.parse_hotkey('a+b'), parsed)
+            self.assertEqual(keyboard.parse_hotkey('a+b'), parsed)
+        finally:
+            keyboard._os_keyboard.refresh_tables = old_refresh_tables
+
+    def test_name_tables_saved(self):
+        import os, shutil, tempfile
+        from . import _name_tables
+        directory = tempfile.mkdtemp()
+        old_cache_home = os.environ.get('XDG_CACHE_HOME')
+        os.environ['XDG_CACHE_HOME'] = directory
+        try:
+            tables = {'to_name': [[(1, ('shift',)), ['A']]]}
+            _name_tables.save('test', 'layout', tables)
+            loaded = _name_tables.load('test', 'layout')
+            self.assertEqual(_name_tables.tuples(loaded['to_name'][0][0]), (1, ('shift',)))
+            self.assertEqual(loaded['to_name'][0][1], ['A'])
+            self.assertIsNone(_name_tables.load('test', 'other layout'))
+            self.assertIsNone(_name_tables.load('missing', 'layout'))
+        finally:
+            if old_cache_home is None:
+                del os.environ['XDG_CACHE_HOME']
+            else:
+                os.environ['XDG_CACHE_HOME'] = old_cache_home
+            shutil.rmtree(directory)
+
+    def test_modifier_sequencer_holds_modifier(self):
+        sequencer = keyboard.ModifierSequencer()
+        sequencer.tap('a', ['left shift'])
+        sequencer.tap('b', ['left shift'])
+        sequencer.tap('c', ['left shift'])
+        sequencer.release_modifiers()
+        self.do([], d_shift+du_a+du_b+du_c+u_shift)
+    def test_modifier_sequencer_natural_releases(self):
+        sequencer = keyboard.ModifierSequencer()
+        sequencer.tap('a', ['left shift'])
+        sequencer.tap('b')
+        sequencer.tap('c', ['left shift'])
+        sequencer.release_modifiers()
+        self.do([], d_shift+du_a+u_shift+du_b+d_shift+du_c+u_shift)
+    def test_modifier_sequencer_switch_modifier(self):
+        sequencer = keyboard.ModifierSequencer()
+        sequencer.tap('a', ['left shift'])
+        sequencer.tap('b', ['left ctrl'])
+        sequencer.release_modifiers()
+        self.do([], d_shift+du_a+u_shift+d_ctrl+du_b+u_ctrl)
+    def test_modifier_sequencer_keep_shared_modifier(self):
+        sequencer = keyboard.ModifierSequencer()
+        sequencer.tap('a', ['left ctrl', 'left shift'])
+        sequencer.tap('b', ['left ctrl'])
+        sequencer.release_modifiers()
+        self.do([], d_ctrl+d_shift+du_a+u_shift+du_b+u_ctrl)
+    def test_modifier_sequencer_chord_scan_codes(self):
+        sequencer = keyboard.ModifierSequencer()
+        sequencer.tap([1, 2], [5])
+        sequencer.release_modifiers()
+        sequencer.release_modifiers()
+        self.do([], d_shift+d_a+d_b+u_b+u_a+u_shift)
+
     def test_call_later(self):
         triggered = []
         def fn(arg1, arg2):
@@ -649,6 +737,73 @@ class TestKeyboard(unittest.TestCase):
     def test_add_hotkey_single_step_timeout(self):
         keyboard.add_hotkey('a', trigger, timeout=1, suppress=True)
         self.do(du_a, triggered_event)
+    def test_hotkey_matcher_single_step(self):
+        matcher = keyboard.HotkeyMatcher(suppress=True)
+        matcher.add_hotkeys({'a': trigger, 'ctrl+b': trigger})
+        matcher.start()
+        self.do(du_a+du_b, triggered_event+du_b)
+        self.do(d_ctrl+du_b+u_ctrl, d_ctrl+triggered_event+u_ctrl)
+    def test_hotkey_matcher_allow(self):
+        triggered = []
+        matcher = keyboard.HotkeyMatcher(suppress=False)
+        matcher.add_hotkeys({'a': lambda: triggered.append(True)})
+        matcher.start()
+        self.do(du_a+du_b, du_a+du_b)
+        self.assertEqual(triggered, [True])
+    def test_hotkey_matcher_multi_step(self):
+        matcher = keyboard.HotkeyMatcher(suppress=True)
+        matcher.add_hotkeys({'a, b': trigger, 'a, c': trigger})
+        matcher.start()
+        self.do(du_a+du_b, du_a+triggered_event)
+        self.do(du_a+du_c, du_a+triggered_event)
+        self.do(du_b+du_a+du_space+du_b, du_b+du_a+du_space+du_b)
+    def test_hotkey_matcher_multi_step_modifier(self):
+        matcher = keyboard.HotkeyMatcher(suppress=True)
+        matcher.add_hotkeys({'a, ctrl+b': trigger})
+        matcher.start()
+        self.do(du_a+d_ctrl+du_b+u_ctrl, du_a+d_ctrl+triggered_event+u_ctrl)
+    def test_hotkey_matcher_restart(self):
+        matcher = keyboard.HotkeyMatcher(suppress=True)
+        matcher.add_hotkeys({'a, b': trigger})
+        matcher.start()
+        self.do(du_a+du_a+du_b, du_a+du_a+triggered_event)
+    def test_hotkey_matcher_timeout(self):
+        matcher = keyboard.HotkeyMatcher(suppress=True, timeout=0.01)
+        matcher.add_hotkeys({'a, b': trigger})
+        matcher.start()
+        self.do(du_a, du_a)
+        time.sleep(0.03)
+        self.do(du_b, du_b)
+    def test_hotkey_matcher_remove(self):
+        matcher = keyboard.HotkeyMatcher(suppress=True)
+        matcher.add_hotkeys({'a': trigger, 'b': trigger, 'c': trigger})
+        matcher.start()
+        matcher.remove_hotkeys(['a', 'c'])
+        self.do(du_a+du_b+du_c, du_a+triggered_event+du_c)
+        matcher.add_hotkeys({'b': lambda: None})
+        self.do(du_b, [])
+    def test_hotkey_matcher_remove_missing(self):
+        matcher = keyboard.HotkeyMatcher(suppress=True)
+        matcher.add_hotkeys({'a': trigger})
+        matcher.start()
+        with self.assertRaises(KeyError):
+            matcher.remove_hotkeys(['a', 'b'])
+        self.do(du_a, triggered_event)
+        matcher.remove_hotkeys(['a'])
+        self.do(du_a, du_a)
+    def test_hotkey_matcher_stop(self):
+        matcher = keyboard.HotkeyMatcher(suppress=True)
+        matcher.add_hotkeys({'a': trigger})
+        matcher.start()
+        matcher.stop()
+        self.do(du_a, du_a)
+    def test_hotkey_matcher_invalid(self):
+        matcher = keyboard.HotkeyMatcher()
+        with self.assertRaises(ValueError):
+            matcher.add_hotkeys({'a': trigger, 'none': trigger})
+        matcher.start()
+        self.do(du_a, du_a)
+
     def test_add_hotkey_multi_step_first_timeout(self):
         keyboard.add_hotkey('a, b', trigger, timeout=0.01, suppress=True)
         time.sleep(0.03)
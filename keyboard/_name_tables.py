@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+On-disk copy of the key name tables built by the OS backends. Building them
+means running `dumpkeys` on Linux or probing every scan code and virtual key
+code on Windows, which is slow enough to be felt at startup. A saved copy is
+only used if it was made for the same fingerprint (keymap, keyboard layout)
+and version; `keyboard.refresh_key_names` rebuilds it on demand.
+
+Tables are stored as JSON, so tuples come back as lists (see `tuples`).
+"""
+import os
+import json
+
+CACHE_VERSION = 1
+
+def cache_path(name):
+    base = (os.environ.get('XDG_CACHE_HOME') or os.environ.get('LOCALAPPDATA')
+            or os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(base, 'keyboard', name + '.json')
+
+def tuples(value):
+    """ Turns the lists of a value loaded from JSON back into tuples. """
+    if isinstance(value, list):
+        return tuple(tuples(item) for item in value)
+    return value
+
+def load(name, fingerprint):
+    """
+    Returns the tables saved under `name`, or None if there are none for
+    this fingerprint.
+    """
+    try:
+        with open(cache_path(name)) as f:
+            data = json.load(f)
+    except (IOError, OSError, ValueError):
+        return None
+    if data.get('version') != CACHE_VERSION or data.get('fingerprint') != fingerprint:
+        return None
+    return data['tables']
+
+def save(name, fingerprint, tables):
+    """
+    Saves the tables under `name`. Failing to write is not an error, the
+    tables are just built again next time.
+    """
+    path = cache_path(name)
+    temp_path = path + '.tmp'
+    try:
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(temp_path, 'w') as f:
+            json.dump({'version': CACHE_VERSION, 'fingerprint': fingerprint, 'tables': tables}, f)
+        os.replace(temp_path, path)
+    except (IOError, OSError):
+        pass
@@ -2,6 +2,7 @@
 import struct
 import os
 import atexit
+import selectors
 from time import time as now
 from threading import Thread
 from glob import glob
@@ -11,6 +12,9 @@ except ImportError:
     from Queue import Queue
 
 event_bin_format = 'llHHI'
+event_size = struct.calcsize(event_bin_format)
+# Most events read from a device in one go.
+max_read_events = 64
 
 # Taken from include/linux/input.h
 # https://www.kernel.org/doc/Documentation/input/event-codes.txt
@@ -80,10 +84,27 @@ class EventDevice(object):
         return self._output_file
 
     def read_event(self):
-        data = self.input_file.read(struct.calcsize(event_bin_format))
+        data = self.input_file.read(event_size)
         seconds, microseconds, type, code, value = struct.unpack(event_bin_format, data)
         return seconds + microseconds / 1e6, type, code, value, self.path
 
+    def read_events(self):
+        """
+        Reads the events waiting on the device in one call, as a list.
+        Blocks for the first event unless the file was made non-blocking, in
+        which case the list may be empty. The kernel only hands out whole
+        events.
+        """
+        try:
+            data = os.read(self.input_file.fileno(), event_size * max_read_events)
+        except BlockingIOError:
+            return []
+        if not data:
+            raise EOFError('{} was closed.'.format(self.path))
+        path = self.path
+        return [(seconds + microseconds / 1e6, type, code, value, path)
+                for seconds, microseconds, type, code, value in struct.iter_unpack(event_bin_format, data)]
+
     def write_event(self, type, code, value):
         integer, fraction = divmod(now(), 1)
         seconds = int(integer)
@@ -97,20 +118,45 @@ class EventDevice(object):
         self.output_file.flush()
 
 class AggregatedEventDevice(object):
+    """
+    Merges the events of several devices. A single thread waits on all of
+    them with a selector and queues the events of each wake-up as one batch.
+    """
     def __init__(self, devices, output=None):
         self.event_queue = Queue()
         self.devices = devices
         self.output = output or self.devices[0]
-        def start_reading(device):
-            while True:
-                self.event_queue.put(device.read_event())
+        self._batch = iter(())
+        thread = Thread(target=self._read_devices)
+        thread.daemon = True
+        thread.start()
+
+    def _read_devices(self):
+        selector = selectors.DefaultSelector()
         for device in self.devices:
-            thread = Thread(target=start_reading, args=[device])
-            thread.setDaemon(True)
-            thread.start()
+            fd = device.input_file.fileno()
+            os.set_blocking(fd, False)
+            selector.register(fd, selectors.EVENT_READ, device)
+        while True:
+            batch = []
+            for key, _ in selector.select():
+                try:
+                    batch.extend(key.data.read_events())
+                except (OSError, EOFError):
+                    # Device unplugged.
+                    selector.unregister(key.fd)
+            if batch:
+                self.event_queue.put(batch)
+
+    def read_events(self):
+        """ Blocks until events arrive and returns them as a list. """
+        return self.event_queue.get(block=True)
 
     def read_event(self):
-        return self.event_queue.get(block=True)
+        for event in self._batch:
+            return event
+        self._batch = iter(self.read_events())
+        return next(self._batch)
 
     def write_event(self, type, code, value):
         self.output.write_event(type, code, value)
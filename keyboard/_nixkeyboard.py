@@ -6,6 +6,7 @@ from collections import namedtuple
 from ._keyboard_event import KeyboardEvent, KEY_DOWN, KEY_UP
 from ._canonical_names import all_modifiers, normalize_name
 from ._nixcommon import EV_KEY, aggregate_devices, ensure_root
+from . import _name_tables
 
 # TODO: start by reading current keyboard state, as to not missing any already pressed keys.
 # See: http://stackoverflow.com/questions/3649874/how-to-get-keyboard-state-in-linux
@@ -47,6 +48,8 @@ have a list of names and vice-versa.
 """
 from subprocess import check_output
 from collections import defaultdict
+import hashlib
+import os
 import re
 
 to_name = defaultdict(list)
@@ -59,10 +62,54 @@ def register_key(key_and_modifiers, name):
     if key_and_modifiers not in from_name[name]:
         from_name[name].append(key_and_modifiers)
 
-def build_tables():
-    if to_name and from_name: return
+# Files the console keymap is configured from, on the common distributions.
+keymap_files = ['/etc/vconsole.conf', '/etc/default/keyboard', '/etc/default/console-setup', '/etc/conf.d/keymaps']
+
+def keymap_fingerprint():
+    """
+    Identifies the keymap `dumpkeys` would report, without running it: the
+    kernel release and the keymap configuration files.
+    """
+    digest = hashlib.sha1(os.uname()[2].encode('utf-8'))
+    for path in keymap_files:
+        try:
+            with open(path, 'rb') as f:
+                digest.update(path.encode('utf-8') + b'\0' + f.read())
+        except (IOError, OSError):
+            pass
+    return digest.hexdigest()
+
+def dump_tables():
+    return {
+        'to_name': [[key, names] for key, names in to_name.items()],
+        'from_name': from_name,
+        'keypad_scan_codes': sorted(keypad_scan_codes),
+    }
+
+def load_tables(tables):
+    for key, names in tables['to_name']:
+        to_name[_name_tables.tuples(key)] = names
+    for name, keys in tables['from_name'].items():
+        from_name[name] = [_name_tables.tuples(key) for key in keys]
+    keypad_scan_codes.update(tables['keypad_scan_codes'])
+
+def build_tables(refresh=False):
+    """
+    Fills the name tables, from the saved copy if it matches the current
+    keymap, otherwise from `dumpkeys`. `refresh=True` always rebuilds them.
+    """
+    if to_name and from_name and not refresh: return
     ensure_root()
 
+    to_name.clear()
+    from_name.clear()
+    keypad_scan_codes.clear()
+    fingerprint = keymap_fingerprint()
+    tables = None if refresh else _name_tables.load('linux', fingerprint)
+    if tables is not None:
+        load_tables(tables)
+        return
+
     modifiers_bits = {
         'shift': 1,
         'alt gr': 2,
@@ -102,6 +149,11 @@ def build_tables():
             from_name[original].extend(from_name[synonym])
             from_name[synonym].extend(from_name[original])
 
+    _name_tables.save('linux', fingerprint, dump_tables())
+
+def refresh_tables():
+    build_tables(refresh=True)
+
 device = None
 def build_device():
     global device
@@ -120,25 +172,25 @@ def listen(callback):
     build_tables()
 
     while True:
-        time, type, code, value, device_id = device.read_event()
-        if type != EV_KEY:
-            continue
+        for time, type, code, value, device_id in device.read_events():
+            if type != EV_KEY:
+                continue
 
-        scan_code = code
-        event_type = KEY_DOWN if value else KEY_UP # 0 = UP, 1 = DOWN, 2 = HOLD
+            scan_code = code
+            event_type = KEY_DOWN if value else KEY_UP # 0 = UP, 1 = DOWN, 2 = HOLD
 
-        pressed_modifiers_tuple = tuple(sorted(pressed_modifiers))
-        names = to_name[(scan_code, pressed_modifiers_tuple)] or to_name[(scan_code, ())] or ['unknown']
-        name = names[0]
+            pressed_modifiers_tuple = tuple(sorted(pressed_modifiers))
+            names = to_name[(scan_code, pressed_modifiers_tuple)] or to_name[(scan_code, ())] or ['unknown']
+            name = names[0]
             
-        if name in all_modifiers:
-            if event_type == KEY_DOWN:
-                pressed_modifiers.add(name)
-            else:
-                pressed_modifiers.discard(name)
-
-        is_keypad = scan_code in keypad_scan_codes
-        callback(KeyboardEvent(event_type=event_type, scan_code=scan_code, name=name, time=time, device=device_id, is_keypad=is_keypad, modifiers=pressed_modifiers_tuple))
+            if name in all_modifiers:
+                if event_type == KEY_DOWN:
+                    pressed_modifiers.add(name)
+                else:
+                    pressed_modifiers.discard(name)
+
+            is_keypad = scan_code in keypad_scan_codes
+            callback(KeyboardEvent(event_type=event_type, scan_code=scan_code, name=name, time=time, device=device_id, is_keypad=is_keypad, modifiers=pressed_modifiers_tuple))
 
 def write_event(scan_code, is_down):
     build_device()
@@ -75,30 +75,37 @@ init = build_device
 def listen(queue):
     build_device()
 
+    # A motion comes as REL_X and REL_Y followed by EV_SYN. The position is
+    # read and reported once per motion, at the EV_SYN.
+    moved = False
     while True:
-        time, type, code, value, device_id = device.read_event()
-        if type == EV_SYN or type == EV_MSC:
-            continue
-
-        event = None
-        arg = None
-
-        if type == EV_KEY:
-            event = ButtonEvent(DOWN if value else UP, button_by_code.get(code, '?'), time)
-        elif type == EV_REL:
-            value, = struct.unpack('i', struct.pack('I', value))
-
-            if code == REL_WHEEL:
-                event = WheelEvent(value, time)
-            elif code in (REL_X, REL_Y):
-                x, y = get_position()
-                event = MoveEvent(x, y, time)
-
-        if event is None:
-            # Unknown event type.
-            continue
-
-        queue.put(event)
+        for time, type, code, value, device_id in device.read_events():
+            if type == EV_SYN:
+                if moved:
+                    moved = False
+                    x, y = get_position()
+                    queue.put(MoveEvent(x, y, time))
+                continue
+            if type == EV_MSC:
+                continue
+
+            event = None
+            arg = None
+
+            if type == EV_KEY:
+                event = ButtonEvent(DOWN if value else UP, button_by_code.get(code, '?'), time)
+            elif type == EV_REL:
+                if code == REL_WHEEL:
+                    value, = struct.unpack('i', struct.pack('I', value))
+                    event = WheelEvent(value, time)
+                elif code in (REL_X, REL_Y):
+                    moved = True
+
+            if event is None:
+                # Unknown event type.
+                continue
+
+            queue.put(event)
 
 def press(button=LEFT):
     build_device()
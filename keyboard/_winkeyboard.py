@@ -19,6 +19,7 @@ from collections import defaultdict
 
 from ._keyboard_event import KeyboardEvent, KEY_DOWN, KEY_UP
 from ._canonical_names import normalize_name
+from . import _name_tables
 try:
     # Force Python2 to convert to unicode and not to str.
     chr = unichr
@@ -148,6 +149,10 @@ VkKeyScan = user32.VkKeyScanW
 VkKeyScan.argtypes = [WCHAR]
 VkKeyScan.restype = c_short
 
+GetKeyboardLayout = user32.GetKeyboardLayout
+GetKeyboardLayout.argtypes = [DWORD]
+GetKeyboardLayout.restype = ctypes.c_void_p
+
 LLKHF_INJECTED = 0x00000010
 
 WM_KEYDOWN = 0x0100
@@ -380,13 +385,41 @@ def get_event_names(scan_code, vk, is_extended, modifiers):
     if not is_keypad and is_official:
         yield official_virtual_keys[vk][0]
 
-def _setup_name_tables():
+def _layout_fingerprint():
+    """ Identifies the active keyboard layout the name tables depend on. """
+    return '{:x}'.format(GetKeyboardLayout(0) or 0)
+
+def _dump_tables():
+    return {
+        'to_name': [[entry, names] for entry, names in to_name.items()],
+        'from_name': from_name,
+        'scan_code_to_vk': list(scan_code_to_vk.items()),
+    }
+
+def _load_tables(tables):
+    for entry, names in tables['to_name']:
+        to_name[_name_tables.tuples(entry)] = names
+    for name, lines in tables['from_name'].items():
+        from_name[name] = [_name_tables.tuples(line) for line in lines]
+    scan_code_to_vk.update(tables['scan_code_to_vk'])
+
+def _setup_name_tables(refresh=False):
     """
     Ensures the scan code/virtual key code/name translation tables are
-    filled.
+    filled, from the saved copy if it was made for the active layout.
+    `refresh=True` always rebuilds them.
     """
     with tables_lock:
-        if to_name: return
+        if to_name and not refresh: return
+
+        to_name.clear()
+        from_name.clear()
+        scan_code_to_vk.clear()
+        fingerprint = _layout_fingerprint()
+        tables = None if refresh else _name_tables.load('windows', fingerprint)
+        if tables is not None:
+            _load_tables(tables)
+            return
 
         # Go through every possible scan code, and map them to virtual key codes.
         # Then vice-versa.
@@ -435,9 +468,14 @@ def _setup_name_tables():
     for name, entries in list(from_name.items()):
         from_name[name] = sorted(set(entries), key=order_key)
 
+    _name_tables.save('windows', fingerprint, _dump_tables())
+
 # Called by keyboard/__init__.py
 init = _setup_name_tables
 
+def refresh_tables():
+    _setup_name_tables(refresh=True)
+
 # List created manually.
 keypad_keys = [
     # (scan_code, virtual_key_code, is_extended)
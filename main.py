@@ -1,19 +1,19 @@
 import os
+import csv
 import sys
 import time
 import threading
-from mido import MidiFile
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import keyboard
+import player
 
 # --- CONFIGURATION ---
-ROW_KEYS = [
-    ['z', 'x', 'c', 'v', 'b', 'n', 'm'], # Low Row (Octave 0)
-    ['a', 's', 'd', 'f', 'g', 'h', 'j'], # Medium Row (Octave 1)
-    ['q', 'w', 'e', 'r', 't', 'y', 'u']  # High Row (Octave 2)
-]
-
-C3_PITCH = 48
-MAX_PITCH = C3_PITCH + 35 # Highest note in the 3-row layout
+SPIN_BUDGET = player.DEFAULT_SPIN_BUDGET # Busy-wait this long before each note
+PART_MODE = 'All' # One of player.PART_MODES, e.g. 'No Drums'
+MAX_KEYS_PER_SECOND = 0 # 0 = no limit; dense passages are thinned to fit
+REPEAT_WINDOW = player.DEFAULT_REPEAT_WINDOW # Merge repeats of a key within this many seconds
+LATENCY_CSV = None # Set to a file name to record the timing of every note and save it as CSV
+
 play_state = 'idle'
 stop_signal = False
 manual_octave_offset = 0
@@ -22,29 +22,10 @@ manual_octave_offset = 0
 last_hotkey_time = 0
 debounce_sec = 0.2
 
-def get_key_and_modifier(pitch):
-    relative_pitch = pitch % 12
-    semitone_map = {
-        0: (0, 0), 1: (0, 1), 2: (1, 0), 3: (2, -1),
-        4: (2, 0), 5: (3, 0), 6: (3, 1), 7: (4, 0),
-        8: (4, 1), 9: (5, 0), 10: (6, -1), 11: (6, 0)
-    }
-
-    octave = (pitch - C3_PITCH) // 12
-    # Ensure octave is valid for our ROW_KEYS list
-    if octave < 0 or octave >= len(ROW_KEYS):
-        return None, None
-
-    key_idx, mod = semitone_map[relative_pitch]
-    return ROW_KEYS[octave][key_idx], mod
-
-def find_best_shift(midi_file):
-    notes = [n.note for n in midi_file if not n.is_meta and n.type == 'note_on']
-    if not notes: return 0
-    avg_note = sum(notes) / len(notes)
-    return round((60 - avg_note) / 12) * 12
-
-def play_midi(midi, auto_shifting, speed):
+def find_best_shift(song):
+    return player.best_transpose(song.histogram())
+
+def play_midi(song, auto_shifting, speed):
     global play_state, stop_signal, manual_octave_offset
 
     for i in range(3, 0, -1):
@@ -55,42 +36,28 @@ def play_midi(midi, auto_shifting, speed):
     print("\n[PLAYING] F5: Stop | +/-: Octave Shift")
     play_state = 'playing'
 
-    for event in midi:
-        if stop_signal or play_state != 'playing': break
-
-        time.sleep(max(0, event.time / speed))
-        if event.is_meta or event.type != 'note_on' or event.velocity == 0:
-            continue
-
-        pitch = event.note + auto_shifting + manual_octave_offset
-
-        # --- FOLDING LOGIC ---
-        # Fold high notes down until they fit
-        while pitch > MAX_PITCH:
-            pitch -= 12
+    offset = manual_octave_offset
+    limits = dict(max_rate=MAX_KEYS_PER_SECOND, repeat_window=REPEAT_WINDOW if MAX_KEYS_PER_SECOND else 0.0)
+    timeline = player.Timeline(song, auto_shifting + offset, fold_high=True, speed=speed, **limits)
 
-        # Ignore low notes (let them be missing without clamping)
-        if pitch < C3_PITCH:
-            continue
+    def on_action(next_index):
+        nonlocal offset
+        # Octave shifted mid-song: remap only the part not played yet.
+        if manual_octave_offset != offset:
+            offset = manual_octave_offset
+            timeline.recompile(next_index, auto_shifting + offset, fold_high=True, speed=speed, **limits)
 
-        key, mod = get_key_and_modifier(pitch)
-
-        if key is None: # Safety check
-            continue
-
-        if mod == 1:
-            keyboard.press('shift')
-            keyboard.press_and_release(key)
-            keyboard.release('shift')
-        elif mod == -1:
-            keyboard.press('ctrl')
-            keyboard.press_and_release(key)
-            keyboard.release('ctrl')
-        else:
-            keyboard.press_and_release(key)
+    recorder = player.LatencyRecorder() if LATENCY_CSV else None
+    scheduler = player.play_timeline(timeline, lambda: stop_signal or play_state != 'playing', on_action,
+                                     player.Scheduler(spin=SPIN_BUDGET), recorder)
 
     play_state = 'idle'
-    print("\n[FINISHED] Ready. Press F5 to play again.")
+    mean_late, max_late = scheduler.summary()
+    print(f"\nNote lateness: avg {mean_late * 1000:.2f} ms, max {max_late * 1000:.2f} ms")
+    if recorder is not None:
+        print(recorder.summary())
+        recorder.dump_csv(LATENCY_CSV)
+    print("[FINISHED] Ready. Press F5 to play again.")
 
 def change_octave(amount):
     global manual_octave_offset, last_hotkey_time
@@ -105,16 +72,53 @@ def change_octave(amount):
     current = manual_octave_offset // 12
     print(f"Current Octave Offset: {current} ({manual_octave_offset} semitones)      ", end='\r')
 
-def toggle_control(midi, shifting, speed):
+def toggle_control(song, shifting, speed):
     global play_state, stop_signal
     if play_state == 'playing':
         stop_signal = True
         play_state = 'idle'
     else:
         stop_signal = False
-        threading.Thread(target=play_midi, args=(midi, shifting, speed), daemon=True).start()
+        threading.Thread(target=play_midi, args=(song, shifting, speed), daemon=True).start()
+
+REPORT_FIELDS = ['file', 'best_shift', 'playable', 'folded', 'modifier_ratio', 'peak_nps', 'length', 'error']
+
+def analyze_folder(directory, report_path=None):
+    """
+    Analyzes every MIDI file under `directory` on all cores, printing each
+    result as soon as it's ready and writing them to a CSV report if
+    `report_path` is given.
+    """
+    paths = sorted(os.path.join(root, name) for root, _, names in os.walk(directory)
+                   for name in names if name.lower().endswith(('.mid', '.midi')))
+    print(f"Analyzing {len(paths)} files...")
+    report = open(report_path, 'w', newline='') if report_path else None
+    try:
+        writer = csv.DictWriter(report, REPORT_FIELDS) if report else None
+        if writer: writer.writeheader()
+        with ProcessPoolExecutor() as pool:
+            futures = [pool.submit(player.analyze_file, path) for path in paths]
+            for future in as_completed(futures):
+                result = future.result()
+                name = os.path.relpath(result['file'], directory)
+                if 'error' in result:
+                    print(f"{name}: {result['error']}")
+                else:
+                    print(f"{name}: shift {result['best_shift']:+d}, playable {result['playable']:.0%}, "
+                          f"folded {result['folded']:.0%}, modifiers {result['modifier_ratio']:.0%}, "
+                          f"peak {result['peak_nps']} notes/s, {result['length']:.0f}s")
+                if writer:
+                    writer.writerow(result)
+                    report.flush()
+    finally:
+        if report: report.close()
 
 if __name__ == '__main__':
+    # Batch mode: python main.py --analyze <folder> [report.csv]
+    if len(sys.argv) > 2 and sys.argv[1] == '--analyze':
+        analyze_folder(sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else None)
+        sys.exit(0)
+
     midi_path = sys.argv[1] if len(sys.argv) > 1 else 'asd.midi'
 
     if not os.path.exists(midi_path):
@@ -122,26 +126,32 @@ if __name__ == '__main__':
         sys.exit(1)
 
     try:
-        midi = MidiFile(midi_path)
-        auto_shift = find_best_shift(midi)
+        song = player.load_song(midi_path)
+        for part in song.part_stats():
+            print(part)
+        song = player.select_parts(song, PART_MODE)
+        auto_shift = find_best_shift(song)
 
         print(f"File: {midi_path}")
-        print(f"Auto-Shifting: {auto_shift // 12} octaves")
+        print(f"Parts: {PART_MODE} ({len(song)} notes)")
+        print(f"Auto-Shifting: {auto_shift:+d} semitones")
         print("---------------------------------")
         print("F5            : Start / Stop")
         print("+ / =         : Octave Up")
         print("-             : Octave Down")
         print("Esc           : Exit Script")
 
-        keyboard.add_hotkey('f5', lambda: toggle_control(midi, auto_shift, 1.0), suppress=True)
+        hotkeys = keyboard.HotkeyMatcher(suppress=True)
+        hotkeys.add_hotkeys({'f5': lambda: toggle_control(song, auto_shift, 1.0)})
 
         for k in ['+', '=', 'plus']:
-            try: keyboard.add_hotkey(k, lambda: change_octave(1), suppress=True)
+            try: hotkeys.add_hotkeys({k: lambda: change_octave(1)})
             except: pass
 
         for k in ['-', '_', 'minus']:
-            try: keyboard.add_hotkey(k, lambda: change_octave(-1), suppress=True)
+            try: hotkeys.add_hotkeys({k: lambda: change_octave(-1)})
             except: pass
+        hotkeys.start()
 
         keyboard.wait('esc')
     except Exception as e:
@@ -1,28 +1,27 @@
 import os
 import sys
 import time
+import queue
 import threading
 import random
+from concurrent.futures import ProcessPoolExecutor
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 
 # --- DEPENDENCY CHECK ---
 try:
-    from mido import MidiFile
     import keyboard
+    import player
 except ImportError:
     print("\n[!] Missing dependencies. Run: pip install mido keyboard")
     sys.exit(1)
 
 # --- CONFIGURATION ---
-row_keys = [
-    ['z', 'x', 'c', 'v', 'b', 'n', 'm'], # Low Pitch Row (Octave 0)
-    ['a', 's', 'd', 'f', 'g', 'h', 'j'], # Medium Pitch Row (Octave 1)
-    ['q', 'w', 'e', 'r', 't', 'y', 'u']  # High Pitch Row (Octave 2)
-]
-
-C3_MIDI_PITCH = 48
-MAX_PITCH = C3_MIDI_PITCH + 35
+SPIN_BUDGET = player.DEFAULT_SPIN_BUDGET # Busy-wait this long before each note
+REPEAT_WINDOW = player.DEFAULT_REPEAT_WINDOW # Merge repeats of a key within this many seconds
+LATENCY_CSV = None # Set to a file name to record the timing of every note and save it as CSV
+UI_REFRESH_HZ = 20 # How often the progress display is redrawn and settings are passed to the player
+PREFETCH_SONGS = 2 # Upcoming playlist entries to load and compile while a song plays
 
 class MidiMacroGUI:
     def __init__(self, root):
@@ -37,8 +36,23 @@ class MidiMacroGUI:
         self.total_time_sec = 0
         self.current_index = -1
 
+        # Shared with the player thread. The player only writes plain
+        # attributes (position, song, status text) and reads `self.settings`,
+        # which the Tk thread replaces as a whole when a widget changes, so
+        # the note loop never waits on the Tcl interpreter.
+        self.settings = None
+        self.status_text = None
+        self.shown = (None, None, None)
+
+        # Upcoming songs are prepared in the background, keyed by (path, settings).
+        self.prefetcher = player.Prefetcher(self.prepare_song, size=PREFETCH_SONGS)
+        self.parse_pool = ProcessPoolExecutor(max_workers=1)
+        self.shuffle_queue = []
+
         # Toggle Variables
         self.fold_high_enabled = tk.BooleanVar(value=True)
+        self.auto_transpose_enabled = tk.BooleanVar(value=True)
+        self.part_mode = tk.StringVar(value=player.PART_MODES[0])
         self.loop_enabled = tk.BooleanVar(value=False)
         self.shuffle_enabled = tk.BooleanVar(value=False)
         self.auto_next_enabled = tk.BooleanVar(value=True)
@@ -99,10 +113,20 @@ class MidiMacroGUI:
         self.octave_shift.insert(0, "0")
         self.octave_shift.pack(side="left", padx=5)
 
+        tk.Label(settings_frame, text="Max keys/s:").pack(side="left")
+        self.max_rate_entry = tk.Entry(settings_frame, width=4)
+        self.max_rate_entry.insert(0, "0")
+        self.max_rate_entry.pack(side="left", padx=5)
+
+        tk.Label(settings_frame, text="Parts:").pack(side="left")
+        ttk.Combobox(settings_frame, textvariable=self.part_mode, values=player.PART_MODES,
+                     state="readonly", width=12).pack(side="left", padx=5)
+
         # Toggles Row
         toggles_frame = tk.Frame(root)
         toggles_frame.pack(pady=5)
         tk.Checkbutton(toggles_frame, text="Fold High", variable=self.fold_high_enabled).pack(side="left", padx=5)
+        tk.Checkbutton(toggles_frame, text="Auto Transpose", variable=self.auto_transpose_enabled).pack(side="left", padx=5)
         tk.Checkbutton(toggles_frame, text="Loop", variable=self.loop_enabled).pack(side="left", padx=5)
         tk.Checkbutton(toggles_frame, text="Shuffle", variable=self.shuffle_enabled).pack(side="left", padx=5)
         tk.Checkbutton(toggles_frame, text="Auto-Next", variable=self.auto_next_enabled).pack(side="left", padx=5)
@@ -119,16 +143,40 @@ class MidiMacroGUI:
         self.status = tk.StringVar(value="Status: Ready")
         tk.Label(root, textvariable=self.status, font=("Arial", 10, "italic")).pack(pady=5)
 
+        # The playlist is kept in the library index, with song metadata
+        # filled in by a background pool (see refresh_ui). Files are parsed
+        # in their own processes, like prepare_song does.
+        self.library_pool = ProcessPoolExecutor(max_workers=2)
+        self.library = player.Library(parse_pool=self.library_pool)
+        self.library_updates = queue.Queue()
+        self.load_library()
+
         self.setup_hotkeys()
+        self.refresh_ui()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    def on_close(self):
+        # Queued parsing would otherwise keep the process (and its keyboard
+        # hooks) alive after the window is gone.
+        self.stop_play()
+        keyboard.unhook_all()
+        self.library.close()
+        for pool in (self.library_pool, self.parse_pool):
+            pool.shutdown(wait=False, cancel_futures=True)
+        self.root.destroy()
 
     # --- HOTKEY LOGIC ---
     def setup_hotkeys(self):
-        try:
-            keyboard.add_hotkey('f5', self.toggle_play_macro, suppress=True)
-            for k in ['=', '+']:
-                keyboard.add_hotkey(k, self.hotkey_inc, suppress=True)
-            for k in ['-', '_']:
-                keyboard.add_hotkey(k, self.hotkey_dec, suppress=True)
+        # Keys missing from the current layout are skipped one by one, so
+        # F5 keeps working whatever happens to the others.
+        self.hotkeys = keyboard.HotkeyMatcher(suppress=True)
+        for keys, callback in ((['f5'], self.toggle_play_macro),
+                               (['=', '+'], self.hotkey_inc),
+                               (['-', '_'], self.hotkey_dec)):
+            for k in keys:
+                try: self.hotkeys.add_hotkeys({k: callback})
+                except: pass
+        try: self.hotkeys.start()
         except: pass
 
     def hotkey_inc(self):
@@ -159,6 +207,7 @@ class MidiMacroGUI:
         self.stop_play()
         self.playlist_data = []
         self.listbox.delete(0, tk.END)
+        self.library.clear()
         self.progress['value'] = 0
         self.time_label.config(text="00:00 / 00:00")
         self.status.set("Status: Playlist Cleared")
@@ -166,85 +215,182 @@ class MidiMacroGUI:
     def format_time(self, seconds):
         return f"{int(seconds // 60):02d}:{int(seconds % 60):02d}"
 
+    def song_label(self, path):
+        """ Returns the listbox text for a song, with its length and playable share once known. """
+        info = self.library.songs.get(path)
+        if not info: return os.path.basename(path)
+        return f"{os.path.basename(path)}  [{self.format_time(info['length'])} | {info['playable']:.0%}]"
+
+    def load_library(self):
+        for path in self.library.paths():
+            self.playlist_data.append(path)
+            self.listbox.insert("end", self.song_label(path))
+        self.library.refresh(on_update=lambda path, info: self.library_updates.put(path))
+
     def add_files(self):
         files = filedialog.askopenfilenames(filetypes=[("MIDI files", "*.mid *.midi")])
-        for f in files:
+        new_files = [f for f in files if f not in self.playlist_data]
+        for f in new_files:
             self.playlist_data.append(f)
-            self.listbox.insert("end", os.path.basename(f))
+            self.listbox.insert("end", self.song_label(f))
+        self.library.add(new_files, on_update=lambda path, info: self.library_updates.put(path))
+
+    def read_settings(self):
+        """
+        Reads the setting widgets. Tk thread only. The first six values shape
+        the timeline of a song (see `compile_settings`), the last three are
+        the Loop, Shuffle and Auto-Next playlist toggles.
+        """
+        try:
+            speed = float(self.speed_entry.get())
+            manual_trans = int(self.octave_shift.get()) * 12
+        except: speed, manual_trans = 1.0, 0
+        try: max_rate = max(0, int(self.max_rate_entry.get()))
+        except: max_rate = 0
+        return (manual_trans, self.auto_transpose_enabled.get(), self.fold_high_enabled.get(),
+                speed, max_rate, self.part_mode.get(),
+                self.loop_enabled.get(), self.shuffle_enabled.get(), self.auto_next_enabled.get())
+
+    def song_key(self, path, settings):
+        """ Returns the prefetch key of a song: its path and the settings its timeline depends on. """
+        return path, settings[:6]
+
+    def compile_settings(self, settings, auto_shift):
+        """ Returns the (transpose, fold_high, speed, max_rate, repeat_window) Timeline settings. """
+        manual_trans, auto_transpose, fold_high, speed, max_rate = settings[:5]
+        if auto_transpose:
+            manual_trans += auto_shift
+        repeat_window = REPEAT_WINDOW if max_rate else 0.0
+        return manual_trans, fold_high, speed, max_rate, repeat_window
+
+    def prepare_song(self, key):
+        """ Returns (song, auto_shift, timeline) ready to play for a (path, settings) key. """
+        path, settings = key
+        # Parse in another process so the note loop keeps the GIL; this
+        # process then only maps the cached result.
+        try: self.parse_pool.submit(player.cache_song, path).result()
+        except: pass
+        song = player.select_parts(player.load_song(path), settings[5])
+        auto_shift = player.best_transpose(song.histogram())
+        return song, auto_shift, player.Timeline(song, *self.compile_settings(settings, auto_shift))
+
+    def upcoming(self, count, settings):
+        """ Returns the playlist indexes of up to `count` songs that auto-next will play next. """
+        loop, shuffle, _ = settings[6:]
+        if not self.playlist_data: return []
+        if shuffle:
+            while len(self.shuffle_queue) < count:
+                self.shuffle_queue.append(random.randint(0, len(self.playlist_data) - 1))
+            return self.shuffle_queue[:count]
+        del self.shuffle_queue[:]
+        indexes = []
+        for index in range(self.current_index + 1, self.current_index + 1 + count):
+            if index >= len(self.playlist_data):
+                if not loop: break
+                index %= len(self.playlist_data)
+            indexes.append(index)
+        return indexes
+
+    def refresh_ui(self):
+        """
+        Runs on the Tk thread UI_REFRESH_HZ times a second: publishes changed
+        settings to the player and shows what the player published.
+        """
+        settings = self.read_settings()
+        if settings != self.settings:
+            self.settings = settings
+
+        if self.status_text is not None:
+            self.status.set(self.status_text)
+            self.status_text = None
+
+        while not self.library_updates.empty():
+            path = self.library_updates.get()
+            if path in self.playlist_data:
+                i = self.playlist_data.index(path)
+                selected = self.listbox.selection_includes(i)
+                self.listbox.delete(i)
+                self.listbox.insert(i, self.song_label(path))
+                if selected: self.listbox.selection_set(i)
+
+        if self.play_state == 'playing':
+            shown = (self.current_index, int(self.current_time_sec), self.total_time_sec)
+            if shown[0] != self.shown[0] and 0 <= shown[0] < len(self.playlist_data):
+                self.listbox.selection_clear(0, tk.END)
+                self.listbox.selection_set(shown[0])
+                self.listbox.see(shown[0])
+            if shown != self.shown:
+                self.time_label.config(text=f"{self.format_time(self.current_time_sec)} / {self.format_time(self.total_time_sec)}")
+            self.shown = shown
+            self.progress['value'] = (self.current_time_sec / self.total_time_sec) * 100 if self.total_time_sec > 0 else 0
+        else:
+            self.shown = (None, None, None)
+
+        self.root.after(1000 // UI_REFRESH_HZ, self.refresh_ui)
 
     def play_logic(self):
+        self.prefetcher.prefetch(self.song_key(self.playlist_data[self.current_index], self.settings))
         for i in range(3, 0, -1):
             if self.stop_signal: return
-            self.status.set(f"Switch to Game! {i}...")
+            self.status_text = f"Switch to Game! {i}..."
             time.sleep(1)
 
+        latency_error = ""
         while self.play_state == 'playing' and not self.stop_signal:
+            settings = self.settings
             try:
-                mid = MidiFile(self.playlist_data[self.current_index])
-                self.total_time_sec = mid.length
+                path = self.playlist_data[self.current_index]
+                song, auto_shift, timeline = self.prefetcher.get(self.song_key(path, settings))
+                self.total_time_sec = song.length
                 self.current_time_sec = 0
-                self.listbox.selection_clear(0, tk.END)
-                self.listbox.selection_set(self.current_index)
-                self.listbox.see(self.current_index)
-                self.status.set(f"Playing: {os.path.basename(self.playlist_data[self.current_index])}")
+                self.status_text = f"Playing: {os.path.basename(path)}"
             except: break
 
-            semitone_map = {0: (0, 0), 1: (0, 1), 2: (1, 0), 3: (2, -1), 4: (2, 0), 5: (3, 0), 6: (3, 1), 7: (4, 0), 8: (4, 1), 9: (5, 0), 10: (6, -1), 11: (6, 0)}
-
-            for event in mid:
-                if self.stop_signal: break
+            # Get the next songs ready while this one plays.
+            if settings[8]:
+                for index in self.upcoming(PREFETCH_SONGS, settings):
+                    self.prefetcher.prefetch(self.song_key(self.playlist_data[index], settings))
+
+            def on_action(next_index):
+                nonlocal settings
+                self.current_time_sec = song.times[timeline.sources[next_index - 1]]
+
+                # Settings changed mid-song: recompile only the part not played yet.
+                if self.settings is not settings:
+                    changed = self.settings[:6] != settings[:6]
+                    settings = self.settings
+                    if changed:
+                        timeline.recompile(next_index, *self.compile_settings(settings, auto_shift))
+
+            recorder = player.LatencyRecorder() if LATENCY_CSV else None
+            scheduler = player.play_timeline(timeline, lambda: self.stop_signal, on_action,
+                                             player.Scheduler(spin=SPIN_BUDGET), recorder)
+            if recorder is not None:
+                mean_late, max_late = scheduler.summary()
+                print(f"Note lateness: avg {mean_late * 1000:.2f} ms, max {max_late * 1000:.2f} ms")
+                print(recorder.summary())
                 try:
-                    speed = float(self.speed_entry.get())
-                    manual_trans = int(self.octave_shift.get()) * 12
-                except: speed, manual_trans = 1.0, 0
-
-                time.sleep(max(0, event.time / speed))
-                self.current_time_sec += event.time
-                self.progress['value'] = (self.current_time_sec / self.total_time_sec) * 100 if self.total_time_sec > 0 else 0
-                self.time_label.config(text=f"{self.format_time(self.current_time_sec)} / {self.format_time(self.total_time_sec)}")
-
-                if event.type != 'note_on' or event.velocity == 0: continue
-
-                pitch = event.note + manual_trans
-
-                if self.fold_high_enabled.get():
-                    while pitch > MAX_PITCH:
-                        pitch -= 12
-
-                if pitch < C3_MIDI_PITCH or pitch > MAX_PITCH: continue
-
-                relative_pitch = pitch % 12
-                octave = (pitch - C3_MIDI_PITCH) // 12
-
-                if 0 <= octave < len(row_keys):
-                    key_idx, modifier = semitone_map[relative_pitch]
-                    target_key = row_keys[octave][key_idx]
-
-                    if modifier == 1:
-                        keyboard.press('shift'); keyboard.press_and_release(target_key); keyboard.release('shift')
-                    elif modifier == -1:
-                        keyboard.press('ctrl'); keyboard.press_and_release(target_key); keyboard.release('ctrl')
-                    else:
-                        keyboard.press_and_release(target_key)
+                    recorder.dump_csv(LATENCY_CSV)
+                except OSError as e:
+                    latency_error = f" (latency CSV not saved: {e})"
 
             if self.stop_signal: break
-            if not self.auto_next_enabled.get(): break
+            settings = self.settings
+            if not settings[8]: break
 
-            if self.shuffle_enabled.get():
-                self.current_index = random.randint(0, len(self.playlist_data) - 1)
-            else:
-                self.current_index += 1
-                if self.current_index >= len(self.playlist_data):
-                    if self.loop_enabled.get(): self.current_index = 0
-                    else: break
+            upcoming = self.upcoming(1, settings)
+            if not upcoming: break
+            self.current_index = upcoming[0]
+            if self.shuffle_queue: self.shuffle_queue.pop(0)
 
         self.play_state = 'idle'
-        self.status.set("Status: Finished/Stopped")
+        self.status_text = "Status: Finished/Stopped" + latency_error
 
     def start_play(self):
         if not self.playlist_data: return
         selection = self.listbox.curselection()
         self.current_index = selection[0] if selection else 0
+        self.settings = self.read_settings()
         self.stop_signal = False
         self.play_state = 'playing'
         threading.Thread(target=self.play_logic, daemon=True).start()
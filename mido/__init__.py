@@ -11,6 +11,7 @@ designed to be as straight forward and Pythonic as possible.
 Creating messages:
 
     Message(type, **parameters) -- create a new message
+    CompactMessage(type, **parameters) -- a channel message in __slots__
     MetaMessage(type, **parameters) -- create a new meta message
     UnknownMetaMessage(type_byte, data=None, time=0)
 
@@ -33,6 +34,7 @@ MIDI files:
     bpm2tempo()  -- convert beats per minute to MIDI file tempo
     tempo2bpm()  -- convert MIDI file tempo to beats per minute
     merge_tracks(tracks)  -- merge tracks into one track
+    TempoMap(ticks_per_beat, tempo_changes)  -- convert ticks to seconds
 
 SYX files:
 
@@ -100,6 +102,7 @@ from .messages import (
     MAX_SONGPOS,
     MIN_PITCHWHEEL,
     MIN_SONGPOS,
+    CompactMessage,
     Message,
     format_as_string,
     parse_string,
@@ -110,6 +113,7 @@ from .midifiles import (
     MetaMessage,
     MidiFile,
     MidiTrack,
+    TempoMap,
     UnknownMetaMessage,
     bpm2tempo,
     merge_tracks,
@@ -122,6 +126,7 @@ from .syx import read_syx_file, write_syx_file
 #from .version import version_info
 
 __all__ = [
+    "CompactMessage",
     "KeySignatureError",
     "MAX_PITCHWHEEL",
     "MAX_SONGPOS",
@@ -132,6 +137,7 @@ __all__ = [
     "MidiFile",
     "MidiTrack",
     "Parser",
+    "TempoMap",
     "UnknownMetaMessage",
     "bpm2tempo",
     "format_as_string",
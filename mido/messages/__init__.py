@@ -3,6 +3,7 @@
 # SPDX-License-Identifier: MIT
 
 from .checks import check_time
+from .compact import CompactMessage
 from .messages import (
     BaseMessage,
     Message,
@@ -22,6 +23,7 @@ from .specs import (
 
 __all__ = [
     "BaseMessage",
+    "CompactMessage",
     "MAX_PITCHWHEEL",
     "MAX_SONGPOS",
     "MIN_PITCHWHEEL",
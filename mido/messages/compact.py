@@ -0,0 +1,208 @@
+# SPDX-FileCopyrightText: 2016 Ole Martin Bjorndalen <ombdalen@gmail.com>
+#
+# SPDX-License-Identifier: MIT
+
+"""Memory efficient channel voice messages.
+
+A Message keeps its values in a per-instance dictionary. CompactMessage
+stores a channel voice message as its status byte, two data bytes and a
+time in __slots__, which takes a fraction of the memory. The values are
+decoded from the bytes on attribute access.
+"""
+from .checks import check_msgdict, check_value
+from .messages import BaseMessage, Message
+from .specs import MIN_PITCHWHEEL, SPEC_BY_TYPE, make_msgdict
+from .strings import msg2str
+
+# Status byte (without channel) -> (type, {data byte name: index}).
+# Pitchwheel uses both data bytes for one value, marked by index None.
+_LAYOUTS = {
+    0x80: ('note_off', {'note': 0, 'velocity': 1}),
+    0x90: ('note_on', {'note': 0, 'velocity': 1}),
+    0xa0: ('polytouch', {'note': 0, 'value': 1}),
+    0xb0: ('control_change', {'control': 0, 'value': 1}),
+    0xc0: ('program_change', {'program': 0}),
+    0xd0: ('aftertouch', {'value': 0}),
+    0xe0: ('pitchwheel', {'pitch': None}),
+}
+
+COMPACT_TYPES = {type_ for type_, _ in _LAYOUTS.values()}
+
+
+def _data_property(name):
+    def fget(self):
+        try:
+            index = _LAYOUTS[self._status & 0xf0][1][name]
+        except KeyError:
+            raise AttributeError('{} message has no attribute {}'.format(
+                self.type, name)) from None
+
+        if index is None:
+            return self._data1 | ((self._data2 << 7) + MIN_PITCHWHEEL)
+        elif index:
+            return self._data2
+        else:
+            return self._data1
+
+    return property(fget, doc=f'The {name} value of the message.')
+
+
+class CompactMessage(BaseMessage):
+    """A channel voice message stored in __slots__.
+
+    This can be used in place of Message for note_on, note_off,
+    polytouch, control_change, program_change, aftertouch and
+    pitchwheel messages. Attribute access, bytes(), copy(), dict() and
+    comparison work the same, and a CompactMessage compares equal to
+    the Message with the same values.
+    """
+    __slots__ = ('_status', '_data1', '_data2', 'time')
+
+    def __init__(self, type, skip_checks=False, **args):
+        if type not in COMPACT_TYPES:
+            raise ValueError(f'{type!r} is not a channel voice message')
+
+        msgdict = make_msgdict(type, args)
+        if not skip_checks:
+            check_msgdict(msgdict)
+
+        self._set_values(msgdict)
+
+    def _set_values(self, msgdict):
+        type_ = msgdict['type']
+        status_byte = SPEC_BY_TYPE[type_]['status_byte']
+        names = _LAYOUTS[status_byte][1]
+
+        data = [0, 0]
+        for name, index in names.items():
+            if index is None:
+                pitch = msgdict['pitch'] - MIN_PITCHWHEEL
+                data = [pitch & 0x7f, pitch >> 7]
+            else:
+                data[index] = msgdict[name]
+
+        _set_status(self, status_byte | msgdict['channel'])
+        _set_data1(self, data[0])
+        _set_data2(self, data[1])
+        _set_time(self, msgdict['time'])
+
+    @classmethod
+    def from_message(cls, msg):
+        """Return a CompactMessage with the same values as msg."""
+        return cls(skip_checks=True, **msg.dict())
+
+    @classmethod
+    def from_bytes(cls, data, time=0):
+        """Parse a byte encoded channel voice message."""
+        return cls.from_message(Message.from_bytes(data, time=time))
+
+    def to_message(self):
+        """Return a regular Message with the same values."""
+        return Message(skip_checks=True, **self.dict())
+
+    @property
+    def type(self):
+        return _LAYOUTS[self._status & 0xf0][0]
+
+    @property
+    def channel(self):
+        return self._status & 0x0f
+
+    note = _data_property('note')
+    velocity = _data_property('velocity')
+    value = _data_property('value')
+    control = _data_property('control')
+    program = _data_property('program')
+    pitch = _data_property('pitch')
+
+    def dict(self):
+        msgdict = {'type': self.type, 'time': self.time,
+                   'channel': self.channel}
+        for name in _LAYOUTS[self._status & 0xf0][1]:
+            msgdict[name] = getattr(self, name)
+        return msgdict
+
+    def copy(self, skip_checks=False, **overrides):
+        """Return a copy of the message.
+
+        Works like Message.copy().
+        """
+        if not overrides:
+            msg = _new(self.__class__)
+            _set_status(msg, self._status)
+            _set_data1(msg, self._data1)
+            _set_data2(msg, self._data2)
+            _set_time(msg, self.time)
+            return msg
+
+        if 'type' in overrides and overrides['type'] != self.type:
+            raise ValueError('copy must be same message type')
+
+        msgdict = self.dict()
+        msgdict.update(overrides)
+
+        if not skip_checks:
+            check_msgdict(msgdict)
+
+        msg = _new(self.__class__)
+        msg._set_values(msgdict)
+        return msg
+
+    def bytes(self):
+        """Encode message and return as a list of integers."""
+        if self._status & 0xf0 in (0xc0, 0xd0):
+            return [self._status, self._data1]
+        return [self._status, self._data1, self._data2]
+
+    def __len__(self):
+        return SPEC_BY_TYPE[self.type]['length']
+
+    def __str__(self):
+        return msg2str(self.dict())
+
+    def __setattr__(self, name, value):
+        if name == 'time':
+            check_value(name, value)
+            _set_time(self, value)
+        elif name == 'type':
+            raise AttributeError('type attribute is read only')
+        elif name not in self.dict():
+            raise AttributeError('{} message has no '
+                                 'attribute {}'.format(self.type, name))
+        else:
+            check_value(name, value)
+            msgdict = self.dict()
+            msgdict[name] = value
+            self._set_values(msgdict)
+
+    def __getstate__(self):
+        return (self._status, self._data1, self._data2, self.time)
+
+    def __setstate__(self, state):
+        _set_status(self, state[0])
+        _set_data1(self, state[1])
+        _set_data2(self, state[2])
+        _set_time(self, state[3])
+
+
+_new = object.__new__
+# Slot setters that bypass the checking __setattr__.
+_set_status = CompactMessage._status.__set__
+_set_data1 = CompactMessage._data1.__set__
+_set_data2 = CompactMessage._data2.__set__
+_set_time = CompactMessage.time.__set__
+
+
+def make_compact(status_byte, data1, data2, time=0):
+    """Build a CompactMessage from already validated bytes.
+
+    No checks are done. data2 is ignored for two byte messages.
+    This is not a part of the public API.
+    """
+    msg = _new(CompactMessage)
+    _set_status(msg, status_byte)
+    _set_data1(msg, data1)
+    _set_data2(msg, data2 if status_byte & 0xf0 not in (0xc0, 0xd0) else 0)
+    _set_time(msg, time)
+    return msg
+
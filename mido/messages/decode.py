@@ -46,6 +46,14 @@ def _make_special_cases():
 _SPECIAL_CASES = _make_special_cases()
 
 
+# Names of the values carried in the data bytes, by message type.
+_DATA_BYTE_NAMES = {
+    spec['type']: tuple(name for name in spec['value_names']
+                        if name != 'channel')
+    for spec in SPEC_BY_STATUS.values()
+}
+
+
 def _decode_data_bytes(status_byte, data, spec):
     # Subtract 1 for status byte.
     if len(data) != (spec['length'] - 1):
@@ -53,8 +61,7 @@ def _decode_data_bytes(status_byte, data, spec):
             'wrong number of bytes for {} message'.format(spec['type']))
 
     # TODO: better name than args?
-    names = [name for name in spec['value_names'] if name != 'channel']
-    args = {name: value for name, value in zip(names, data)}
+    args = dict(zip(_DATA_BYTE_NAMES[spec['type']], data))
 
     if status_byte in CHANNEL_MESSAGES:
         # Channel is stored in the lower nibble of the status byte.
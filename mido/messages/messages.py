@@ -13,6 +13,9 @@ from .strings import msg2str, str2msg
 
 class BaseMessage:
     """Abstract base class for messages."""
+    # Leaves it to subclasses to choose between __dict__ and __slots__.
+    __slots__ = ()
+
     is_meta = False
 
     def copy(self):
@@ -99,8 +102,11 @@ class BaseMessage:
         if not isinstance(other, BaseMessage):
             raise TypeError(f'can\'t compare message to {type(other)}')
 
-        # This includes time in comparison.
-        return vars(self) == vars(other)
+        # This includes time in comparison. Messages stored in
+        # __slots__ have no vars() and are compared by dict().
+        if hasattr(self, '__dict__') and hasattr(other, '__dict__'):
+            return vars(self) == vars(other)
+        return self.dict() == other.dict()
 
 
 class SysexData(tuple):
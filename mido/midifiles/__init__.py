@@ -5,13 +5,14 @@
 from .meta import KeySignatureError, MetaMessage, UnknownMetaMessage
 from .midifiles import MidiFile
 from .tracks import MidiTrack, merge_tracks
-from .units import bpm2tempo, second2tick, tempo2bpm, tick2second
+from .units import TempoMap, bpm2tempo, second2tick, tempo2bpm, tick2second
 
 __all__ = [
     "KeySignatureError",
     "MetaMessage",
     "MidiFile",
     "MidiTrack",
+    "TempoMap",
     "UnknownMetaMessage",
     "bpm2tempo",
     "merge_tracks",
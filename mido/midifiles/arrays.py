@@ -0,0 +1,169 @@
+# SPDX-FileCopyrightText: 2016 Ole Martin Bjorndalen <ombdalen@gmail.com>
+#
+# SPDX-License-Identifier: MIT
+
+"""Columnar tables of channel messages.
+
+MidiFile.to_array() and MidiTrack.to_array() return one row per
+channel message with these columns:
+
+    abs_tick     absolute time in ticks
+    abs_seconds  absolute time in seconds
+    status       status byte without the channel (0x80 to 0xe0)
+    channel      channel (0 to 15)
+    note         first data byte (note, control, program, ...)
+    velocity     second data byte (velocity, value, ...) or 0
+    track        index of the track the message came from
+
+The table is a NumPy structured array if NumPy is installed, or an
+EventTable of stdlib arrays otherwise. Both are indexed by column
+name, for example table['note'].
+"""
+from array import array
+
+from .units import tick2second
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Column name and array typecode. NumPy understands the same codes.
+EVENT_COLUMNS = (
+    ('abs_tick', 'q'),
+    ('abs_seconds', 'd'),
+    ('status', 'B'),
+    ('channel', 'B'),
+    ('note', 'B'),
+    ('velocity', 'B'),
+    ('track', 'H'),
+)
+
+
+class EventColumns:
+    """Growing columns that a table is built from.
+
+    abs_seconds is filled in when the table is made. This is not a
+    part of the public API.
+    """
+    def __init__(self):
+        for name, typecode in EVENT_COLUMNS:
+            setattr(self, name, array(typecode))
+
+    def __len__(self):
+        return len(self.abs_tick)
+
+    def add_messages(self, messages, track=0):
+        """Add the channel messages of a track given as Message objects.
+
+        Returns the (absolute tick, tempo) pairs of the set_tempo
+        messages and the absolute tick of the last message.
+        """
+        tempo_changes = []
+        now = 0
+        for msg in messages:
+            now += msg.time
+            if msg.is_meta:
+                if msg.type == 'set_tempo':
+                    tempo_changes.append((now, msg.tempo))
+                continue
+            data = msg.bytes()
+            if data[0] >= 0xf0:
+                continue
+            self.abs_tick.append(now)
+            self.status.append(data[0] & 0xf0)
+            self.channel.append(data[0] & 0x0f)
+            self.note.append(data[1])
+            self.velocity.append(data[2] if len(data) > 2 else 0)
+            self.track.append(track)
+        return tempo_changes, now
+
+
+class EventTable:
+    """Channel message table used when NumPy is not installed.
+
+    Columns are stdlib arrays, looked up by name like the fields of a
+    NumPy structured array. Indexing with an integer returns a row as
+    a tuple.
+    """
+    names = tuple(name for name, _ in EVENT_COLUMNS)
+
+    def __init__(self, columns):
+        self._columns = {name: getattr(columns, name) for name in self.names}
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self._columns[key]
+        return tuple(self._columns[name][key] for name in self.names)
+
+    def __len__(self):
+        return len(self._columns['abs_tick'])
+
+    def __iter__(self):
+        return zip(*(self._columns[name] for name in self.names))
+
+    def __repr__(self):
+        return '{}({} rows, columns={})'.format(
+            self.__class__.__name__, len(self), self.names)
+
+
+def _playback_order(columns):
+    # Rows are added track by track. A stable sort on time gives the
+    # order of a merged track: ties keep track order.
+    order = sorted(range(len(columns)), key=columns.abs_tick.__getitem__)
+    for name, typecode in EVENT_COLUMNS:
+        column = getattr(columns, name)
+        if column:
+            setattr(columns, name, array(typecode,
+                                         map(column.__getitem__, order)))
+
+
+def make_table(columns, tempo_map, merge=False):
+    """Return the table for the columns, with times from tempo_map.
+
+    With merge=True the rows are sorted in playback order. This is not
+    a part of the public API.
+    """
+    if numpy is not None:
+        return _make_numpy_table(columns, tempo_map, merge)
+
+    if merge:
+        _playback_order(columns)
+
+    # Rows are in time order, so walk the tempo segments instead of
+    # searching for each row.
+    segments = list(tempo_map)
+    last = len(segments) - 1
+    i = 0
+    seg_tick, seg_second, tempo = segments[0]
+    scale = tick2second(1, tempo_map.ticks_per_beat, tempo)
+
+    seconds = columns.abs_seconds
+    del seconds[:]
+    append = seconds.append
+    for tick in columns.abs_tick:
+        while i < last and segments[i + 1][0] <= tick:
+            i += 1
+            seg_tick, seg_second, tempo = segments[i]
+            scale = tick2second(1, tempo_map.ticks_per_beat, tempo)
+        append(seg_second + (tick - seg_tick) * scale)
+    return EventTable(columns)
+
+
+def _make_numpy_table(columns, tempo_map, merge):
+    table = numpy.empty(len(columns), dtype=list(EVENT_COLUMNS))
+    for name, typecode in EVENT_COLUMNS:
+        if name != 'abs_seconds':
+            table[name] = numpy.frombuffer(getattr(columns, name),
+                                           dtype=typecode)
+    if merge:
+        table = table[numpy.argsort(table['abs_tick'], kind='stable')]
+
+    ticks = table['abs_tick']
+    seg_ticks = numpy.array(tempo_map.ticks, dtype='q')
+    seg = numpy.searchsorted(seg_ticks, ticks, side='right') - 1
+    scales = numpy.array([tick2second(1, tempo_map.ticks_per_beat, tempo)
+                          for tempo in tempo_map.tempos])
+    table['abs_seconds'] = (numpy.array(tempo_map.seconds)[seg]
+                            + (ticks - seg_ticks[seg]) * scales[seg])
+    return table
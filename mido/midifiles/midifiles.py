@@ -19,15 +19,26 @@ http://www.recordingblogs.com/sa/tabid/82/EntryId/44/MIDI-Part-XIII-Delta-time-a
 http://www.sonicspot.com/guide/midifiles.html
 """
 
+import io
 import string
 import struct
 import time
 from numbers import Integral
+from operator import itemgetter
 
 from ..messages import SPEC_BY_STATUS, Message
+from ..messages.compact import COMPACT_TYPES, CompactMessage, make_compact
+from ..messages.specs import CHANNEL_MESSAGES, MIN_PITCHWHEEL
+from .arrays import EventColumns, make_table
 from .meta import MetaMessage, build_meta_message, encode_variable_int, meta_charset
-from .tracks import MidiTrack, fix_end_of_track, merge_tracks
-from .units import tick2second
+from .tracks import (
+    MidiTrack,
+    _abstime_pairs,
+    fix_end_of_track,
+    merge_abstime,
+    merge_tracks,
+)
+from .units import TempoMap, tick2second
 
 # The default tempo is 120 BPM.
 # (500000 microseconds per beat (quarter note).)
@@ -167,18 +178,288 @@ def read_meta_message(infile, delta):
     return build_meta_message(meta_type, data, delta)
 
 
-def read_track(infile, debug=False, clip=False):
-    track = MidiTrack()
+def _decode_variable_int(data, pos):
+    delta = 0
+
+    while True:
+        byte = data[pos]
+        pos += 1
+        delta = (delta << 7) | (byte & 0x7f)
+        if byte < 0x80:
+            return delta, pos
+
+
+def _slice_bytes(data, pos, size):
+    if size > MAX_MESSAGE_LENGTH:
+        raise OSError('Message length {} exceeds maximum length {}'.format(
+            size, MAX_MESSAGE_LENGTH))
+    end = pos + size
+    if end > len(data):
+        raise EOFError
+    return list(data[pos:end]), end
+
+
+def _make_channel_decoding():
+    # status byte -> (type, channel, data byte names, number of data bytes)
+    # Pitchwheel has None for names since its two bytes make one value.
+    decoding = {}
+    for status_byte, spec in SPEC_BY_STATUS.items():
+        if status_byte in CHANNEL_MESSAGES:
+            if spec['type'] == 'pitchwheel':
+                names = None
+            else:
+                names = tuple(name for name in spec['value_names']
+                              if name != 'channel')
+            decoding[status_byte] = (spec['type'], status_byte & 0x0f,
+                                     names, spec['length'] - 1)
+    return decoding
+
+
+_CHANNEL_DECODING = _make_channel_decoding()
+
+
+def iter_track(data, clip=False, charset=None, compact=False):
+    """Decode the body of an MTrk chunk, yielding one message at a time.
+
+    This is the in-memory counterpart of reading a track message by
+    message from a file. It walks the chunk with an index instead of
+    reading one byte at a time and gives the same messages.
 
+    Meta messages are decoded with the given charset, or with the
+    current one if charset is None. With compact=True channel voice
+    messages are returned as CompactMessage.
+    """
+    end = len(data)
+    pos = 0
+    last_status = None
+
+    try:
+        while pos < end:
+            delta = data[pos]
+            if delta < 0x80:
+                pos += 1
+            else:
+                delta, pos = _decode_variable_int(data, pos)
+
+            status_byte = data[pos]
+            pos += 1
+
+            if status_byte < 0x80:
+                if last_status is None:
+                    raise OSError('running status without last_status')
+                peek_data = [status_byte]
+                status_byte = last_status
+            else:
+                if status_byte != 0xff:
+                    # Meta messages don't set running status.
+                    last_status = status_byte
+                peek_data = []
+
+            if status_byte == 0xff:
+                meta_type = data[pos]
+                length, pos = _decode_variable_int(data, pos + 1)
+                meta_data, pos = _slice_bytes(data, pos, length)
+                if charset is None:
+                    msg = build_meta_message(meta_type, meta_data, delta)
+                else:
+                    with meta_charset(charset):
+                        msg = build_meta_message(meta_type, meta_data, delta)
+            elif status_byte in [0xf0, 0xf7]:
+                length, pos = _decode_variable_int(data, pos)
+                sysex_data, pos = _slice_bytes(data, pos, length)
+                # Strip start and end bytes.
+                if sysex_data and sysex_data[0] == 0xf0:
+                    sysex_data = sysex_data[1:]
+                if sysex_data and sysex_data[-1] == 0xf7:
+                    sysex_data = sysex_data[:-1]
+                if clip:
+                    sysex_data = [byte if byte < 127 else 127
+                                  for byte in sysex_data]
+                msg = Message('sysex', data=sysex_data, time=delta)
+            elif status_byte in _CHANNEL_DECODING:
+                type_, channel, names, size = _CHANNEL_DECODING[status_byte]
+                size -= len(peek_data)
+                data_bytes = peek_data + list(data[pos:pos + size])
+                pos += size
+                if pos > end:
+                    raise EOFError
+
+                if clip:
+                    data_bytes = [byte if byte < 127 else 127
+                                  for byte in data_bytes]
+                elif max(data_bytes) > 127:
+                    raise OSError('data byte must be in range 0..127')
+
+                if compact:
+                    msg = make_compact(status_byte, data_bytes[0],
+                                       data_bytes[-1], delta)
+                else:
+                    # Build the message the way Message.from_bytes()
+                    # would, without the generic decoder and its checks.
+                    msg = Message.__new__(Message)
+                    msgdict = vars(msg)
+                    msgdict['type'] = type_
+                    msgdict['time'] = delta
+                    msgdict['channel'] = channel
+                    if names is None:
+                        msgdict['pitch'] = data_bytes[0] | (
+                            (data_bytes[1] << 7) + MIN_PITCHWHEEL)
+                    else:
+                        msgdict.update(zip(names, data_bytes))
+            else:
+                try:
+                    spec = SPEC_BY_STATUS[status_byte]
+                except LookupError as le:
+                    raise OSError(
+                        f'undefined status byte 0x{status_byte:02x}') from le
+
+                # Subtract 1 for status byte.
+                size = spec['length'] - 1 - len(peek_data)
+                data_bytes, pos = _slice_bytes(data, pos, size)
+                data_bytes = peek_data + data_bytes
+
+                if clip:
+                    data_bytes = [byte if byte < 127 else 127
+                                  for byte in data_bytes]
+                else:
+                    for byte in data_bytes:
+                        if byte > 127:
+                            raise OSError('data byte must be in range 0..127')
+
+                msg = Message.from_bytes([status_byte] + data_bytes,
+                                         time=delta)
+
+            yield msg
+    except IndexError as ie:
+        raise EOFError from ie
+
+
+def decode_track(data, clip=False, compact=False):
+    """Decode the body of an MTrk chunk into a MidiTrack."""
+    return MidiTrack(iter_track(data, clip=clip, compact=compact))
+
+
+def scan_track_events(data, columns, track=0, clip=False):
+    """Add the channel messages of an MTrk chunk body to EventColumns.
+
+    This walks the bytes the same way as iter_track() but creates no
+    message objects. Returns the (absolute tick, tempo) pairs of the
+    set_tempo messages and the absolute tick at the end of the track.
+    """
+    add_tick = columns.abs_tick.append
+    add_status = columns.status.append
+    add_channel = columns.channel.append
+    add_note = columns.note.append
+    add_velocity = columns.velocity.append
+    add_track = columns.track.append
+
+    tempo_changes = []
+    end = len(data)
+    pos = 0
+    now = 0
+    last_status = None
+
+    try:
+        while pos < end:
+            delta = data[pos]
+            if delta < 0x80:
+                pos += 1
+            else:
+                delta, pos = _decode_variable_int(data, pos)
+            now += delta
+
+            status_byte = data[pos]
+            pos += 1
+
+            running = status_byte < 0x80
+            if running:
+                if last_status is None:
+                    raise OSError('running status without last_status')
+                status_byte = last_status
+            elif status_byte != 0xff:
+                # Meta messages don't set running status.
+                last_status = status_byte
+
+            if status_byte in _CHANNEL_DECODING:
+                if running:
+                    # The byte we took for a status byte is data.
+                    pos -= 1
+                data1 = data[pos]
+                if _CHANNEL_DECODING[status_byte][3] == 2:
+                    data2 = data[pos + 1]
+                    pos += 2
+                else:
+                    data2 = 0
+                    pos += 1
+                if pos > end:
+                    raise EOFError
+
+                if data1 > 127 or data2 > 127:
+                    if not clip:
+                        raise OSError('data byte must be in range 0..127')
+                    data1 = min(data1, 127)
+                    data2 = min(data2, 127)
+
+                add_tick(now)
+                add_status(status_byte & 0xf0)
+                add_channel(status_byte & 0x0f)
+                add_note(data1)
+                add_velocity(data2)
+                add_track(track)
+                continue
+
+            if status_byte == 0xff:
+                meta_type = data[pos]
+                size, pos = _decode_variable_int(data, pos + 1)
+                if meta_type == 0x51:
+                    if size < 3:
+                        raise EOFError
+                    tempo_changes.append((now, (data[pos] << 16)
+                                          | (data[pos + 1] << 8)
+                                          | data[pos + 2]))
+            elif status_byte in [0xf0, 0xf7]:
+                size, pos = _decode_variable_int(data, pos)
+            else:
+                try:
+                    spec = SPEC_BY_STATUS[status_byte]
+                except LookupError as le:
+                    raise OSError(
+                        f'undefined status byte 0x{status_byte:02x}') from le
+                if running:
+                    pos -= 1
+                size = spec['length'] - 1
+
+            if size > MAX_MESSAGE_LENGTH:
+                raise OSError('Message length {} exceeds maximum length {}'
+                              .format(size, MAX_MESSAGE_LENGTH))
+            pos += size
+            if pos > end:
+                raise EOFError
+    except IndexError as ie:
+        raise EOFError from ie
+
+    return tempo_changes, now
+
+
+def read_track(infile, debug=False, clip=False, compact=False):
     name, size = read_chunk_header(infile)
 
     if name != b'MTrk':
         raise OSError('no MTrk header at start of track')
 
-    if debug:
-        _dbg(f'-> size={size}')
-        _dbg()
+    if not debug:
+        # Fast path: read the whole chunk at once and decode it in memory.
+        data = infile.read(size)
+        if len(data) < size:
+            raise EOFError
+        return decode_track(data, clip=clip, compact=compact)
+
+    # The debug path reads byte by byte so every byte can be printed
+    # as it is consumed.
+    _dbg(f'-> size={size}')
+    _dbg()
 
+    track = MidiTrack()
     start = infile.tell()
     last_status = None
 
@@ -216,6 +497,8 @@ def read_track(infile, debug=False, clip=False):
             msg = read_sysex(infile, delta, clip)
         else:
             msg = read_message(infile, status_byte, peek_data, delta, clip)
+            if compact and msg.type in COMPACT_TYPES:
+                msg = CompactMessage.from_message(msg)
 
         track.append(msg)
 
@@ -294,7 +577,9 @@ class MidiFile:
                  charset='latin1',
                  debug=False,
                  clip=False,
-                 tracks=None
+                 tracks=None,
+                 lazy=False,
+                 compact=False
                  ):
 
         self.filename = filename
@@ -303,21 +588,60 @@ class MidiFile:
         self.charset = charset
         self.debug = debug
         self.clip = clip
+        self.compact = compact
 
         self.tracks = []
-        self._merged_track = None
 
         if type not in range(3):
             raise ValueError(
                 f'invalid format {format} (must be 0, 1 or 2)')
 
+        # The debug printout is produced while reading, so debug
+        # implies an eager load.
+        lazy = lazy and not debug
+
         if tracks is not None:
             self.tracks = tracks
         elif file is not None:
-            self._load(file)
+            if lazy:
+                self._index(file.read())
+            else:
+                self._load(file)
         elif self.filename is not None:
             with open(filename, 'rb') as file:
-                self._load(file)
+                if lazy:
+                    self._index(file.read())
+                else:
+                    self._load(file)
+
+    @property
+    def tracks(self):
+        """List of MidiTrack objects.
+
+        For a lazily loaded file the tracks are decoded the first time
+        this is accessed.
+        """
+        if self._tracks is None:
+            self._tracks = [MidiTrack(iter_track(chunk, self.clip,
+                                                 self.charset, self.compact))
+                            for chunk in self._chunks]
+            self._chunks = None
+        return self._tracks
+
+    @tracks.setter
+    def tracks(self, tracks):
+        self._tracks = tracks
+        self._chunks = None
+        del self.merged_track  # uncache merged track and tempo map
+
+    @property
+    def lazy(self):
+        """True while the tracks are kept undecoded.
+
+        Iterating a lazy file decodes messages on the fly and never
+        holds more than one pending message per track.
+        """
+        return self._tracks is None
 
     @property
     def merged_track(self):
@@ -333,6 +657,111 @@ class MidiFile:
     @merged_track.deleter
     def merged_track(self):
         self._merged_track = None
+        self._tempo_map = None
+        self._length = None
+
+    def _iter_ticks(self):
+        # (absolute tick, message) pairs in playback order, as in
+        # merged_track.
+        if not self.lazy:
+            yield from _abstime_pairs(self.merged_track)
+            return
+
+        # Merge the raw tracks on the fly. Ties keep track order, and
+        # all end_of_track messages are replaced by one at the end.
+        end_tick = 0
+        for end_tick, msg in merge_abstime(
+                iter_track(chunk, self.clip, self.charset, self.compact)
+                for chunk in self._chunks):
+            if msg.type != 'end_of_track':
+                yield end_tick, msg
+        yield end_tick, MetaMessage('end_of_track')
+
+    def _scan(self):
+        # Build the tempo map and length in a single pass.
+        changes = []
+        end_tick = 0
+        for end_tick, msg in self._iter_ticks():
+            if msg.type == 'set_tempo':
+                changes.append((end_tick, msg.tempo))
+        self._tempo_map = TempoMap(self.ticks_per_beat, changes)
+        self._length = self._tempo_map.tick2second(end_tick)
+
+    @property
+    def tempo_map(self):
+        """TempoMap for converting between ticks and seconds.
+
+        Computed on first use and cached until the tracks change.
+        """
+        if self.type == 2:
+            raise TypeError("can't make a tempo map for type 2"
+                            " (asynchronous) file")
+
+        if self._tempo_map is None:
+            self._scan()
+        return self._tempo_map
+
+    def iter_abstime(self):
+        """Iterate over (seconds, message) pairs in playback order.
+
+        seconds is the absolute playback time of the message. This is
+        a cheaper alternative to iterating over the file: messages are
+        not copied and times come from the tempo map, but the time
+        attribute of the messages is left as it is and should be
+        ignored. Don't modify the messages.
+        """
+        tempo_map = self.tempo_map
+        seg_ticks = tempo_map.ticks
+        seg_seconds = tempo_map.seconds
+        seg_tempos = tempo_map.tempos
+        last = len(seg_ticks) - 1
+        i = 0
+        seg_tick = 0
+        seg_second = 0.0
+        scale = tick2second(1, self.ticks_per_beat, seg_tempos[0])
+
+        for tick, msg in self._iter_ticks():
+            # Ticks only grow, so walk the segments instead of searching.
+            while i < last and seg_ticks[i + 1] <= tick:
+                i += 1
+                seg_tick = seg_ticks[i]
+                seg_second = seg_seconds[i]
+                scale = tick2second(1, self.ticks_per_beat, seg_tempos[i])
+            yield seg_second + (tick - seg_tick) * scale, msg
+
+    def to_array(self):
+        """Return the channel messages as a table, one row per message.
+
+        Rows are in playback order. The table is a NumPy structured
+        array if NumPy is installed, see mido.midifiles.arrays for the
+        columns. A lazy file is scanned straight from the raw track
+        data without creating any messages.
+        """
+        if self.type == 2:
+            raise TypeError("can't make an event table for type 2"
+                            " (asynchronous) file")
+
+        columns = EventColumns()
+        if not self.lazy:
+            for i, track in enumerate(self.tracks):
+                columns.add_messages(track, i)
+            return make_table(columns, self.tempo_map, merge=True)
+
+        tempo_changes = []
+        end_tick = 0
+        for i, chunk in enumerate(self._chunks):
+            changes, track_end = scan_track_events(chunk, columns, i,
+                                                   self.clip)
+            tempo_changes.extend(changes)
+            end_tick = max(end_tick, track_end)
+
+        if self._tempo_map is None:
+            # The sort is stable, so changes at the same tick keep track
+            # order as in merged_track.
+            tempo_changes.sort(key=itemgetter(0))
+            self._tempo_map = TempoMap(self.ticks_per_beat, tempo_changes)
+            self._length = self._tempo_map.tick2second(end_tick)
+        return make_table(columns, self._tempo_map, merge=True)
 
     def add_track(self, name=None):
         """Add a new track to the file.
@@ -370,23 +799,78 @@ class MidiFile:
 
                 self.tracks.append(read_track(infile,
                                               debug=self.debug,
-                                              clip=self.clip))
+                                              clip=self.clip,
+                                              compact=self.compact))
                 # TODO: used to ignore EOFError. I hope things still work.
 
+    def _index(self, data):
+        """Record where each track chunk is without decoding it."""
+        data = memoryview(data)
+        infile = io.BytesIO(data)
+
+        (self.type,
+         num_tracks,
+         self.ticks_per_beat) = read_file_header(infile)
+
+        chunks = []
+        for i in range(num_tracks):
+            name, size = read_chunk_header(infile)
+            if name != b'MTrk':
+                raise OSError('no MTrk header at start of track')
+            start = infile.tell()
+            if start + size > len(data):
+                raise EOFError
+            chunks.append(data[start:start + size])
+            infile.seek(size, io.SEEK_CUR)
+
+        self._tracks = None
+        self._chunks = chunks
+
+    def _iter_lazy(self):
+        """Iterate a lazy file by merging the raw tracks on the fly.
+
+        Gives the same messages as iterating merged_track.
+        """
+        tempo = DEFAULT_TEMPO
+        last_tick = 0
+        for tick, msg in self._iter_ticks():
+            # The message was decoded for us alone, so set its time in
+            # place instead of copying it.
+            if tick > last_tick:
+                delta = tick2second(tick - last_tick,
+                                    self.ticks_per_beat, tempo)
+            else:
+                delta = 0
+            object.__setattr__(msg, 'time', delta)
+            last_tick = tick
+
+            yield msg
+
+            if msg.type == 'set_tempo':
+                tempo = msg.tempo
+
     @property
     def length(self):
         """Playback time in seconds.
 
-        This will be computed by going through every message in every
-        track and adding up delta times.
+        This is computed together with the tempo map the first time it
+        is needed, and cached until the tracks change.
         """
         if self.type == 2:
             raise ValueError('impossible to compute length'
                              ' for type 2 (asynchronous) file')
 
-        return sum(msg.time for msg in self)
+        if self._length is None:
+            self._scan()
+        return self._length
 
     def __iter__(self):
+        if self.lazy:
+            if self.type == 2:
+                raise TypeError("can't merge tracks in type 2 (asynchronous) file")
+            yield from self._iter_lazy()
+            return
+
         tempo = DEFAULT_TEMPO
         for msg in self.merged_track:
             # Convert message time from absolute time
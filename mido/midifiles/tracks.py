@@ -2,7 +2,12 @@
 #
 # SPDX-License-Identifier: MIT
 
+import heapq
+from operator import itemgetter
+
+from .arrays import EventColumns, make_table
 from .meta import MetaMessage
+from .units import TempoMap
 
 
 class MidiTrack(list):
@@ -37,6 +42,19 @@ class MidiTrack(list):
     def copy(self):
         return self.__class__(self)
 
+    def to_array(self, ticks_per_beat=480, tempo_map=None):
+        """Return the channel messages as a table, one row per message.
+
+        Times in seconds come from tempo_map, or from the set_tempo
+        messages of this track if no map is given. See
+        mido.midifiles.arrays for the columns.
+        """
+        columns = EventColumns()
+        tempo_changes, _ = columns.add_messages(self)
+        if tempo_map is None:
+            tempo_map = TempoMap(ticks_per_beat, tempo_changes)
+        return make_table(columns, tempo_map)
+
     def __getitem__(self, index_or_slice):
         # Retrieve item from the MidiTrack
         lst = list.__getitem__(self, index_or_slice)
@@ -103,6 +121,28 @@ def fix_end_of_track(messages, skip_checks=False):
     yield MetaMessage('end_of_track', time=accum)
 
 
+def _abstime_pairs(messages):
+    """Yield (absolute time, message) pairs without copying messages."""
+    now = 0
+    for msg in messages:
+        now += msg.time
+        yield now, msg
+
+
+def merge_abstime(tracks):
+    """Merge tracks into one stream of (absolute time, message) pairs.
+
+    Each track must be in time order, which is always the case for
+    tracks with non-negative delta times. The merge is done lazily with a
+    heap. Messages with the same time come in track order, and in their
+    original order within a track.
+
+    Messages are not copied.
+    """
+    return heapq.merge(*[_abstime_pairs(track) for track in tracks],
+                       key=itemgetter(0))
+
+
 def merge_tracks(tracks, skip_checks=False):
     """Returns a MidiTrack object with all messages from all tracks.
 
@@ -113,15 +153,17 @@ def merge_tracks(tracks, skip_checks=False):
     This should ONLY be used when the messages in tracks have already
     been validated by mido.checks.
     """
-    messages = []
-    for track in tracks:
-        messages.extend(_to_abstime(track, skip_checks=skip_checks))
-
-    messages.sort(key=lambda msg: msg.time)
-
-    return MidiTrack(
-        fix_end_of_track(
-            _to_reltime(messages, skip_checks=skip_checks),
-            skip_checks=skip_checks,
-        )
-    )
+    merged = MidiTrack()
+    append = merged.append
+    last = 0
+    end = 0
+    for now, msg in merge_abstime(tracks):
+        end = now
+        # All end_of_track messages are replaced by one at the end.
+        if msg.type == 'end_of_track':
+            continue
+        append(msg.copy(skip_checks=skip_checks, time=now - last))
+        last = now
+
+    append(MetaMessage('end_of_track', time=end - last))
+    return merged
@@ -2,6 +2,9 @@
 #
 # SPDX-License-Identifier: MIT
 
+from bisect import bisect_right
+
+
 def tick2second(tick, ticks_per_beat, tempo):
     """Convert absolute time in ticks to seconds.
 
@@ -44,3 +47,65 @@ def tempo2bpm(tempo, time_signature=(4, 4)):
     returned tempo depends on the time signature denominator.
     """
     return 60 * 1e6 / tempo * time_signature[1] / 4.
+
+
+class TempoMap:
+    """Conversion between absolute ticks and seconds for a whole song.
+
+    The map is built once from the tempo changes of a song. It stores
+    one segment per tempo in force, as sorted parallel lists of start
+    tick, start time in seconds and tempo, so both conversions are a
+    binary search instead of a walk over every message.
+
+    tempo_changes is an iterable of (absolute tick, tempo) pairs in time
+    order. Before the first change the default tempo of 500000
+    microseconds per beat (120 BPM) applies.
+    """
+    def __init__(self, ticks_per_beat, tempo_changes=()):
+        self.ticks_per_beat = ticks_per_beat
+        self.ticks = [0]
+        self.seconds = [0.0]
+        self.tempos = [500000]
+
+        for tick, tempo in tempo_changes:
+            if tick < self.ticks[-1]:
+                raise ValueError('tempo changes must be in time order')
+            elif tick == self.ticks[-1]:
+                # The last of several changes at the same tick wins.
+                self.tempos[-1] = tempo
+            else:
+                self.seconds.append(self.tick2second(tick))
+                self.ticks.append(tick)
+                self.tempos.append(tempo)
+
+    def __len__(self):
+        return len(self.ticks)
+
+    def __iter__(self):
+        """Iterate over (tick, seconds, tempo) segments."""
+        return zip(self.ticks, self.seconds, self.tempos)
+
+    def tempo_at(self, tick):
+        """Return the tempo in force at an absolute tick."""
+        return self.tempos[max(bisect_right(self.ticks, tick) - 1, 0)]
+
+    def tick2second(self, tick):
+        """Convert an absolute time in ticks to seconds."""
+        i = max(bisect_right(self.ticks, tick) - 1, 0)
+        return self.seconds[i] + tick2second(tick - self.ticks[i],
+                                             self.ticks_per_beat,
+                                             self.tempos[i])
+
+    def second2tick(self, second):
+        """Convert an absolute time in seconds to ticks.
+
+        Normal rounding applies.
+        """
+        i = max(bisect_right(self.seconds, second) - 1, 0)
+        return self.ticks[i] + second2tick(second - self.seconds[i],
+                                           self.ticks_per_beat,
+                                           self.tempos[i])
+
+    def __repr__(self):
+        return '{}(ticks_per_beat={}, segments={})'.format(
+            self.__class__.__name__, self.ticks_per_beat, list(self))
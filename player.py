@@ -0,0 +1,852 @@
+"""
+Playback engine shared by main.py and maingui.py.
+
+A song is compiled ahead of time into a flat timeline of key actions, so the
+playback thread only has to wait for each action and inject its key.
+"""
+import io
+import os
+import csv
+import sys
+import json
+import mmap
+import bisect
+import struct
+import hashlib
+import time
+import threading
+from array import array
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import keyboard
+from mido import MidiFile
+from mido.midifiles.arrays import EventTable
+
+# --- CONFIGURATION ---
+ROW_KEYS = [
+    ['z', 'x', 'c', 'v', 'b', 'n', 'm'], # Low Pitch Row (Octave 0)
+    ['a', 's', 'd', 'f', 'g', 'h', 'j'], # Medium Pitch Row (Octave 1)
+    ['q', 'w', 'e', 'r', 't', 'y', 'u']  # High Pitch Row (Octave 2)
+]
+
+C3_MIDI_PITCH = 48
+MAX_PITCH = C3_MIDI_PITCH + 35 # Highest note in the 3-row layout
+
+# Semitone -> (index in row, modifier). Sharps are played with shift (1),
+# flats with ctrl (-1).
+SEMITONE_MAP = {
+    0: (0, 0), 1: (0, 1), 2: (1, 0), 3: (2, -1),
+    4: (2, 0), 5: (3, 0), 6: (3, 1), 7: (4, 0),
+    8: (4, 1), 9: (5, 0), 10: (6, -1), 11: (6, 0)
+}
+MODIFIER_KEYS = {1: 'shift', -1: 'ctrl'}
+# Largest shift, in semitones either way, tried by the transposition search.
+MAX_TRANSPOSE = 36
+
+# Default for the repeat merging of the rate limiter: the same key pressed
+# again within this many seconds is dropped.
+DEFAULT_REPEAT_WINDOW = 0.03
+
+# General MIDI reserves channel 10 (9 counting from 0) for percussion.
+DRUM_CHANNEL = 9
+PART_MODES = ('All', 'No Drums', 'Melody Only')
+# A melody candidate needs at least this share of the notes of the busiest
+# non-drum part.
+MELODY_MIN_SHARE = 0.25
+# Order of the modifier groups inside a chord.
+_MODIFIER_ORDER = {0: 0, 1: 1, -1: 2}
+# Shift or ctrl stays held into the next chord that needs it, unless that
+# chord is more than this many seconds away.
+MODIFIER_HOLD_LIMIT = 1.0
+
+# Seconds before a deadline at which the scheduler stops sleeping and spins.
+# OS sleeps routinely overshoot by a millisecond or more.
+DEFAULT_SPIN_BUDGET = 0.001
+
+# Parsed songs are cached here, keyed by file content. The vendored mido has
+# no runtime version, so bump CACHE_VERSION whenever parsing or the cache
+# layout changes.
+if os.name == 'nt':
+    _cache_base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+else:
+    _cache_base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser(os.path.join('~', '.cache'))
+CACHE_DIR = os.path.join(_cache_base, 'wwm-instrument-macro')
+CACHE_VERSION = 3
+# Magic, version, note count, length in seconds. Followed by `count` native
+# doubles (times), `count` native unsigned shorts (tracks) and `count` bytes
+# each for notes and channels.
+_CACHE_HEADER = struct.Struct('=4sIId')
+_CACHE_MAGIC = b'WWMS'
+
+# The playlist library: song metadata, refreshed when a file's mtime or size
+# changes. Bump LIBRARY_VERSION when the fields of `song_info` change.
+LIBRARY_FILE = os.path.join(CACHE_DIR, 'library.json')
+LIBRARY_VERSION = 2
+
+def map_pitch(pitch, fold_high=True):
+    """
+    Returns (key, modifier) for a pitch, or (None, None) when the pitch can't
+    be played. With `fold_high` pitches above the layout are brought down by
+    whole octaves; low pitches are always dropped.
+    """
+    if fold_high:
+        while pitch > MAX_PITCH:
+            pitch -= 12
+    if pitch < C3_MIDI_PITCH or pitch > MAX_PITCH:
+        return None, None
+    key_idx, mod = SEMITONE_MAP[pitch % 12]
+    return ROW_KEYS[(pitch - C3_MIDI_PITCH) // 12][key_idx], mod
+
+_scan_codes = {}
+def scan_code(key):
+    """ Returns the (cached) scan code the OS backend uses for a key name. """
+    try:
+        return _scan_codes[key]
+    except KeyError:
+        code = _scan_codes[key] = keyboard.key_to_scan_codes(key)[0]
+        return code
+
+def pitch_table(transpose=0, fold_high=True):
+    """
+    Returns a 128 entry list mapping a MIDI note to its (scan_code, modifier)
+    action under the given settings, or None if the note is dropped.
+    """
+    table = []
+    for note in range(128):
+        key, mod = map_pitch(note + transpose, fold_high)
+        table.append(None if key is None else (scan_code(key), mod))
+    return table
+
+def pitch_histogram(notes):
+    """ Returns a 128 entry list with the number of times each MIDI note occurs. """
+    counts = Counter(notes)
+    return [counts[note] for note in range(128)]
+
+def transpose_scores(histogram):
+    """
+    Scores every shift from -MAX_TRANSPOSE to MAX_TRANSPOSE semitones for a
+    song with the given pitch histogram. Returns (transpose, dropped,
+    modifier_presses) tuples, where `dropped` counts the notes that fall
+    outside the layout (high notes are not folded) and `modifier_presses` the
+    notes that need shift or ctrl. Each shift only looks at the 36 pitches of
+    the layout, so this is cheap enough to run for every song.
+    """
+    total = sum(histogram)
+    scores = []
+    for transpose in range(-MAX_TRANSPOSE, MAX_TRANSPOSE + 1):
+        played = modified = 0
+        for pitch in range(C3_MIDI_PITCH, MAX_PITCH + 1):
+            note = pitch - transpose
+            if 0 <= note < 128:
+                played += histogram[note]
+                if SEMITONE_MAP[pitch % 12][1]:
+                    modified += histogram[note]
+        scores.append((transpose, total - played, modified))
+    return scores
+
+def best_transpose(histogram):
+    """
+    Returns the shift in semitones that drops the fewest notes, then needs the
+    fewest modifier presses, then moves the song the least.
+    """
+    return min(transpose_scores(histogram), key=lambda score: (score[1], score[2], abs(score[0]), score[0]))[0]
+
+class PartStats(object):
+    """
+    Note statistics of one part of a song: the notes of one channel in one
+    track. `low` and `high` are the pitch range, `mean` the average pitch.
+    """
+    def __init__(self, track, channel, notes, low, high, mean, notes_per_second):
+        self.track = track
+        self.channel = channel
+        self.notes = notes
+        self.low = low
+        self.high = high
+        self.mean = mean
+        self.notes_per_second = notes_per_second
+
+    @property
+    def part(self):
+        return self.track, self.channel
+
+    @property
+    def is_drums(self):
+        return self.channel == DRUM_CHANNEL
+
+    def __repr__(self):
+        return 'PartStats(track={}, channel={}, notes={}, range={}-{}, {:.1f}/s)'.format(
+            self.track, self.channel, self.notes, self.low, self.high, self.notes_per_second)
+
+class Song(object):
+    """
+    The playable part of a MIDI file: the note_on events of all tracks in
+    playback order, as parallel arrays of absolute times (seconds), notes,
+    channels and track indexes. The arrays are `array`s, or read-only
+    memoryviews for cached songs.
+    """
+    def __init__(self, times, notes, channels, tracks, length):
+        self.times = times
+        self.notes = notes
+        self.channels = channels
+        self.tracks = tracks
+        self.length = length
+
+    @classmethod
+    def from_midi(cls, midi):
+        events = midi.to_array()
+        if not isinstance(events, EventTable):
+            # NumPy table: pick the rows with a mask and copy whole columns.
+            rows = events[(events['status'] == 0x90) & (events['velocity'] > 0)]
+            return cls(array('d', rows['abs_seconds'].astype('d').tobytes()),
+                       array('B', rows['note'].astype('B').tobytes()),
+                       array('B', rows['channel'].astype('B').tobytes()),
+                       array('H', rows['track'].astype('H').tobytes()),
+                       midi.length)
+
+        times = array('d')
+        notes = array('B')
+        channels = array('B')
+        tracks = array('H')
+        for status, velocity, seconds, note, channel, track in zip(
+                events['status'], events['velocity'], events['abs_seconds'],
+                events['note'], events['channel'], events['track']):
+            if status == 0x90 and velocity:
+                times.append(seconds)
+                notes.append(note)
+                channels.append(channel)
+                tracks.append(track)
+        return cls(times, notes, channels, tracks, midi.length)
+
+    def __len__(self):
+        return len(self.notes)
+
+    def histogram(self):
+        return pitch_histogram(self.notes)
+
+    def part_stats(self):
+        """ Returns a `PartStats` for every (track, channel) part that has notes, in a single pass. """
+        parts = {}
+        for (track, channel, note), count in Counter(zip(self.tracks, self.channels, self.notes)).items():
+            parts.setdefault((track, channel), {})[note] = count
+        stats = []
+        for (track, channel), counts in sorted(parts.items()):
+            total = sum(counts.values())
+            mean = sum(note * count for note, count in counts.items()) / total
+            stats.append(PartStats(track, channel, total, min(counts), max(counts), mean,
+                                   total / self.length if self.length else 0.0))
+        return stats
+
+    def select(self, parts):
+        """ Returns a new `Song` with only the notes of the given (track, channel) parts. """
+        parts = set(parts)
+        song = Song(array('d'), array('B'), array('B'), array('H'), self.length)
+        for i, part in enumerate(zip(self.tracks, self.channels)):
+            if part in parts:
+                song.times.append(self.times[i])
+                song.notes.append(self.notes[i])
+                song.channels.append(part[1])
+                song.tracks.append(part[0])
+        return song
+
+def select_parts(song, mode):
+    """
+    Returns the part of `song` to play for one of `PART_MODES`:
+
+    - 'All': every note.
+    - 'No Drums': everything but the percussion channel.
+    - 'Melody Only': the non-drum part with the highest average pitch among
+      the busier parts.
+
+    Parts are picked from the whole song, as loaded (and cached) with every
+    track merged, because the modes need the statistics of all parts and the
+    cache entry serves every mode. Filtering is then a single pass over the
+    merged arrays; no track is skipped before the merge.
+    """
+    if mode not in PART_MODES[1:]:
+        return song
+    stats = [part for part in song.part_stats() if not part.is_drums]
+    if mode == 'Melody Only' and stats:
+        busiest = max(part.notes for part in stats)
+        candidates = [part for part in stats if part.notes >= busiest * MELODY_MIN_SHARE]
+        stats = [max(candidates, key=lambda part: part.mean)]
+    return song.select(part.part for part in stats)
+
+def _cache_path(data):
+    digest = hashlib.sha1(data).hexdigest()
+    name = '{}-{}-{}.song'.format(digest, CACHE_VERSION, sys.byteorder)
+    return os.path.join(CACHE_DIR, name)
+
+def _read_cached_song(path):
+    with open(path, 'rb') as file:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, count, length = _CACHE_HEADER.unpack_from(mapped)
+    if magic != _CACHE_MAGIC or version != CACHE_VERSION:
+        raise ValueError('stale song cache entry')
+    view = memoryview(mapped)
+    start = _CACHE_HEADER.size
+    times = view[start:start + count * 8].cast('d')
+    start += count * 8
+    tracks = view[start:start + count * 2].cast('H')
+    start += count * 2
+    notes = view[start:start + count]
+    channels = view[start + count:start + count * 2]
+    if len(channels) != count:
+        raise ValueError('truncated song cache entry')
+    return Song(times, notes, channels, tracks, length)
+
+def _write_cached_song(path, song):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+    with open(tmp_path, 'wb') as file:
+        file.write(_CACHE_HEADER.pack(_CACHE_MAGIC, CACHE_VERSION, len(song), song.length))
+        file.write(song.times.tobytes())
+        file.write(song.tracks.tobytes())
+        file.write(song.notes.tobytes())
+        file.write(song.channels.tobytes())
+    os.replace(tmp_path, path)
+
+def load_song(filename):
+    """
+    Returns the `Song` for a MIDI file, from the on-disk cache when the file
+    was seen before. Cached songs are memory mapped, so no MIDI parsing or
+    Message objects are involved. Cache errors fall back to parsing.
+    """
+    with open(filename, 'rb') as file:
+        data = file.read()
+    path = _cache_path(data)
+    try:
+        return _read_cached_song(path)
+    except (OSError, ValueError, struct.error):
+        pass
+
+    song = Song.from_midi(MidiFile(filename, file=io.BytesIO(data), lazy=True))
+    try:
+        _write_cached_song(path, song)
+    except OSError:
+        pass
+    return song
+
+def cache_song(filename):
+    """
+    Makes sure the song cache has an entry for a MIDI file, parsing the file
+    if needed. Meant to run in a worker process, so that parsing doesn't hold
+    the GIL of the process that is playing.
+    """
+    load_song(filename)
+
+def analyze_song(song):
+    """
+    Returns the playability figures of a song on the 3-row layout at its best
+    shift: `best_shift`, the `playable` share of notes (high notes folded),
+    the share of notes that needed `folded`, the `modifier_ratio` of played
+    notes that need shift or ctrl, `peak_nps` (most notes in any one second)
+    and `length` in seconds.
+    """
+    histogram = song.histogram()
+    best_shift = best_transpose(histogram)
+    played = folded = modified = 0
+    for note, count in enumerate(histogram):
+        if not count:
+            continue
+        key, mod = map_pitch(note + best_shift, fold_high=True)
+        if key is None:
+            continue
+        played += count
+        if note + best_shift > MAX_PITCH:
+            folded += count
+        if mod:
+            modified += count
+
+    peak = 0
+    first = 0
+    times = song.times
+    for last in range(len(times)):
+        while times[last] - times[first] >= 1.0:
+            first += 1
+        peak = max(peak, last - first + 1)
+
+    total = len(song)
+    return {
+        'best_shift': best_shift,
+        'playable': played / total if total else 0.0,
+        'folded': folded / total if total else 0.0,
+        'modifier_ratio': modified / played if played else 0.0,
+        'peak_nps': peak,
+        'length': song.length,
+    }
+
+def analyze_file(filename):
+    """
+    `analyze_song` for a MIDI file, parsed directly (the song cache is left
+    alone). Runs in worker processes of the batch analysis, so errors are
+    returned as an `error` entry instead of raised.
+    """
+    try:
+        report = analyze_song(Song.from_midi(MidiFile(filename, lazy=True)))
+    except Exception as e:
+        return {'file': filename, 'error': '{}: {}'.format(type(e).__name__, e)}
+    report['file'] = filename
+    return report
+
+def song_info(filename):
+    """
+    Returns the library metadata of a MIDI file as a JSON friendly dict:
+    file `mtime` and `size`, `length` in seconds, `notes`, pitch range
+    (`low`, `high`), the `best_shift` and the share of notes it makes
+    `playable` (high notes folded, as in `analyze_song`), and the `channels`
+    used.
+    """
+    stat = os.stat(filename)
+    song = load_song(filename)
+    report = analyze_song(song)
+    pitches = [note for note, count in enumerate(song.histogram()) if count]
+    return {
+        'mtime': stat.st_mtime,
+        'size': stat.st_size,
+        'length': song.length,
+        'notes': len(song),
+        'low': pitches[0] if pitches else None,
+        'high': pitches[-1] if pitches else None,
+        'best_shift': report['best_shift'],
+        'playable': report['playable'],
+        'channels': sorted(set(song.channels)),
+    }
+
+class Library(object):
+    """
+    Persistent, ordered index of songs and their `song_info`, stored as JSON.
+    The saved index is loaded on creation, which is instant; metadata is
+    (re)computed by a thread pool for files
+    that are new or whose mtime or size changed. `on_update(path, info)` is
+    called from a pool thread for every fresh entry, and the index is saved
+    whenever the pool runs out of work.
+
+    With a `parse_pool` (a process pool), `song_info` runs there, so a
+    process that is playing keeps the GIL while files are indexed. `close()`
+    drops the work still queued.
+    """
+    def __init__(self, filename=LIBRARY_FILE, workers=4, parse_pool=None):
+        self.filename = filename
+        self.songs = OrderedDict()  # path -> info, or None until known
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        self.pending = 0
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.parse_pool = parse_pool
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.filename, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return
+        if data.get('version') != LIBRARY_VERSION:
+            return
+        for path, info in data['songs']:
+            self.songs[path] = info
+
+    def save(self):
+        with self.lock:
+            data = {'version': LIBRARY_VERSION, 'songs': list(self.songs.items())}
+        with self.save_lock:
+            os.makedirs(os.path.dirname(self.filename), exist_ok=True)
+            tmp_path = '{}.{}.tmp'.format(self.filename, os.getpid())
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(data, file)
+            os.replace(tmp_path, self.filename)
+
+    def paths(self):
+        with self.lock:
+            return list(self.songs)
+
+    def add(self, paths, on_update=None):
+        """ Adds songs to the end of the library and refreshes them in the background. """
+        with self.lock:
+            for path in paths:
+                self.songs.setdefault(path, None)
+        self.refresh(paths, on_update)
+
+    def refresh(self, paths=None, on_update=None):
+        """ Recomputes stale or missing metadata of `paths` (default: all songs) in the background. """
+        for path in self.paths() if paths is None else paths:
+            with self.lock:
+                self.pending += 1
+            self.executor.submit(self._refresh, path, on_update)
+
+    def clear(self):
+        with self.lock:
+            self.songs.clear()
+        self._save_quietly()
+
+    def close(self):
+        """ Cancels the refreshes not started yet and saves the index. """
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self._save_quietly()
+
+    def _refresh(self, path, on_update):
+        try:
+            with self.lock:
+                info = self.songs.get(path, False)
+            if info is False:
+                return  # Removed meanwhile.
+            stat = os.stat(path)
+            if info is not None and info['mtime'] == stat.st_mtime and info['size'] == stat.st_size:
+                return
+            if self.parse_pool is not None:
+                info = self.parse_pool.submit(song_info, path).result()
+            else:
+                info = song_info(path)
+            with self.lock:
+                if path not in self.songs:
+                    return
+                self.songs[path] = info
+            if on_update is not None:
+                on_update(path, info)
+        except Exception:
+            pass  # Unreadable files keep their old entry.
+        finally:
+            with self.lock:
+                self.pending -= 1
+                done = self.pending == 0
+            if done:
+                self._save_quietly()
+
+    def _save_quietly(self):
+        try:
+            self.save()
+        except OSError:
+            pass
+
+class Prefetcher(object):
+    """
+    Runs `load(key)` for upcoming keys on a background thread, so the result
+    is ready by the time it's needed. `get(key)` returns the prefetched result
+    (waiting for it if it's still loading, and re-raising its error), or loads
+    it right away if it was never prefetched. At most `size` results are kept;
+    older ones are dropped.
+    """
+    def __init__(self, load, size=2):
+        self.load = load
+        self.size = size
+        self.pending = OrderedDict()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    def prefetch(self, key):
+        if key in self.pending:
+            return
+        self.pending[key] = self.executor.submit(self.load, key)
+        while len(self.pending) > self.size:
+            self.pending.popitem(last=False)[1].cancel()
+
+    def get(self, key):
+        future = self.pending.pop(key, None)
+        if future is None or future.cancelled():
+            return self.load(key)
+        return future.result()
+
+class _Thinner(object):
+    """
+    Drops keys from chords so the compiled timeline respects a rate limit:
+    at most `max_rate` keys in any second, and no key pressed again within
+    `repeat_window` seconds. Chords are thinned top voice first.
+    """
+    def __init__(self, notes, max_rate, repeat_window):
+        self.notes = notes
+        self.max_rate = max_rate
+        self.repeat_window = repeat_window
+        self.recent = deque()
+        self.last_press = {}
+
+    def pressed(self, action_time, code, mod):
+        self.recent.append(action_time)
+        self.last_press[code, mod] = action_time
+
+    def thin(self, chord, action_time):
+        recent = self.recent
+        while recent and recent[0] <= action_time - 1.0:
+            recent.popleft()
+        kept = []
+        seen = set()
+        for entry in sorted(chord, key=lambda entry: self.notes[entry[3]], reverse=True):
+            key = entry[1], entry[2]
+            if key in seen:
+                continue
+            seen.add(key)
+            last = self.last_press.get(key)
+            if self.repeat_window and last is not None and action_time - last < self.repeat_window:
+                continue
+            if self.max_rate and len(recent) >= self.max_rate:
+                break
+            self.pressed(action_time, *key)
+            kept.append(entry)
+        return kept
+
+class Timeline(object):
+    """
+    Key actions compiled from a `Song`, stored as parallel arrays:
+
+    - `times`: playback time of the action in seconds, already scaled by speed.
+    - `scan_codes`: key to press.
+    - `modifiers`: 1 for shift, -1 for ctrl, 0 for none.
+    - `sources`: index of the song note the action was compiled from.
+    """
+    def __init__(self, song, transpose=0, fold_high=True, speed=1.0, max_rate=0, repeat_window=0.0):
+        self.song = song
+        self.times = array('d')
+        self.scan_codes = array('H')
+        self.modifiers = array('b')
+        self.sources = array('L')
+        self.recompile(0, transpose, fold_high, speed, max_rate, repeat_window)
+
+    def __len__(self):
+        return len(self.sources)
+
+    def recompile(self, start, transpose=0, fold_high=True, speed=1.0, max_rate=0, repeat_window=0.0):
+        """
+        Replaces every action from index `start` (the first action of a chord)
+        onwards with actions compiled under the new settings. Actions before
+        `start` (already played) are kept, and the new tail continues from the
+        last kept action, so changing the speed mid-song doesn't jump.
+
+        Actions sharing a time form a chord. Within a chord, duplicate keys
+        are dropped and actions are grouped by modifier, so each group can be
+        sent under a single modifier hold.
+
+        `max_rate` caps the keys pressed in any one second (0 for no cap), and
+        a key pressed again within `repeat_window` seconds is dropped. Dense
+        passages are thinned here rather than slowed down at playback, highest
+        notes first, so the notes that remain keep their exact times.
+        """
+        self.transpose = transpose
+        self.fold_high = fold_high
+        self.speed = speed
+        self.max_rate = max_rate
+        self.repeat_window = repeat_window
+
+        song_times = self.song.times
+        if start > 0:
+            # Resume after the whole chord that was played last.
+            last = self.sources[start - 1]
+            first = bisect.bisect_right(song_times, song_times[last])
+            origin = self.times[start - 1] - song_times[last] / speed
+        else:
+            first = 0
+            origin = 0.0
+
+        del self.times[start:]
+        del self.scan_codes[start:]
+        del self.modifiers[start:]
+        del self.sources[start:]
+
+        notes = self.song.notes
+        thinner = None
+        if max_rate or repeat_window:
+            thinner = _Thinner(notes, max_rate, repeat_window)
+            # Carry the limits over from the keys already played.
+            since = self.times[-1] - max(1.0, repeat_window) if start > 0 else 0
+            for i in range(bisect.bisect_left(self.times, since), start):
+                thinner.pressed(self.times[i], self.scan_codes[i], self.modifiers[i])
+
+        table = pitch_table(transpose, fold_high)
+        chord = []
+        chord_time = None
+        for i in range(first, len(notes)):
+            action = table[notes[i]]
+            if action is None:
+                continue
+            if song_times[i] != chord_time:
+                self._add_chord(chord, origin + chord_time / speed if chord else 0, thinner)
+                chord = []
+                chord_time = song_times[i]
+            chord.append((_MODIFIER_ORDER[action[1]], action[0], action[1], i))
+        self._add_chord(chord, origin + chord_time / speed if chord else 0, thinner)
+
+    def _add_chord(self, chord, action_time, thinner=None):
+        if thinner is not None:
+            chord = thinner.thin(chord, action_time)
+        seen = set()
+        for _, code, mod, source in sorted(chord):
+            if (code, mod) in seen:
+                continue
+            seen.add((code, mod))
+            self.times.append(action_time)
+            self.scan_codes.append(code)
+            self.modifiers.append(mod)
+            self.sources.append(source)
+
+_modifier_codes = {0: ()}
+def press_chord(codes, modifiers, sequencer):
+    """
+    Taps keys that are played at the same moment. Keys are expected grouped
+    by modifier (see `Timeline.recompile`); each group is sent as a single
+    burst with its modifier held, through a `keyboard.ModifierSequencer`
+    that keeps the modifier down afterwards. The group whose modifier is
+    still held from the previous chord goes first. Returns the modifier left
+    held.
+    """
+    groups = []
+    start = 0
+    for k in range(1, len(codes) + 1):
+        if k == len(codes) or modifiers[k] != modifiers[start]:
+            mod = modifiers[start]
+            if mod not in _modifier_codes:
+                _modifier_codes[mod] = (scan_code(MODIFIER_KEYS[mod]),)
+            group = (_modifier_codes[mod], codes[start:k], mod)
+            if group[0] == sequencer.held:
+                groups.insert(0, group)
+            else:
+                groups.append(group)
+            start = k
+    for mod_codes, keys, mod in groups:
+        sequencer.tap(keys, mod_codes)
+    return groups[-1][2] if groups else 0
+
+class Scheduler(object):
+    """
+    Waits for absolute deadlines, given in seconds since `begin()`, on
+    `time.perf_counter()`. Sleeps until `spin` seconds before each deadline
+    and busy-waits the rest, so oversleeping and time spent injecting keys
+    never accumulate. The lateness of every deadline is kept in `lateness`.
+    """
+    def __init__(self, spin=DEFAULT_SPIN_BUDGET, clock=time.perf_counter):
+        self.spin = spin
+        self.clock = clock
+        self.start = None
+        self.lateness = array('d')
+
+    def begin(self):
+        self.start = self.clock()
+        del self.lateness[:]
+
+    def wait_until(self, offset):
+        """ Blocks until `offset` seconds after `begin()`, returns the lateness. """
+        clock = self.clock
+        deadline = self.start + offset
+        remaining = deadline - clock()
+        if remaining > self.spin:
+            time.sleep(remaining - self.spin)
+        now = clock()
+        while now < deadline:
+            now = clock()
+        late = now - deadline
+        self.lateness.append(late)
+        return late
+
+    def summary(self):
+        """ Returns (mean, max) lateness in seconds, or (0, 0) if nothing ran. """
+        if not self.lateness:
+            return 0.0, 0.0
+        return sum(self.lateness) / len(self.lateness), max(self.lateness)
+
+def _percentiles(values, ranks=(50, 95, 99)):
+    values = sorted(values)
+    if not values:
+        return [0.0 for _ in ranks]
+    return [values[min(len(values) - 1, len(values) * rank // 100)] for rank in ranks]
+
+class LatencyRecorder(object):
+    """
+    Opt-in record of every chord dispatch: the scheduled time, the clock
+    right before and right after the `keyboard` call (all in seconds since
+    `Scheduler.begin()`) and the number of keys. Kept in a ring buffer
+    allocated up front, so recording costs no allocation in the playback
+    loop; once full, the oldest entries are overwritten.
+    """
+    FIELDS = ('scheduled', 'before', 'after', 'lateness', 'injection', 'keys')
+
+    def __init__(self, capacity=65536):
+        self.capacity = capacity
+        self.scheduled = array('d', bytes(8 * capacity))
+        self.before = array('d', bytes(8 * capacity))
+        self.after = array('d', bytes(8 * capacity))
+        self.keys = array('H', bytes(2 * capacity))
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def clear(self):
+        self.count = 0
+
+    def record(self, scheduled, before, after, keys):
+        i = self.count % self.capacity
+        self.scheduled[i] = scheduled
+        self.before[i] = before
+        self.after[i] = after
+        self.keys[i] = keys
+        self.count += 1
+
+    def rows(self):
+        """ Yields (scheduled, before, after, lateness, injection, keys) tuples, oldest first. """
+        first = self.count - len(self)
+        for n in range(first, self.count):
+            i = n % self.capacity
+            yield (self.scheduled[i], self.before[i], self.after[i],
+                   self.before[i] - self.scheduled[i], self.after[i] - self.before[i], self.keys[i])
+
+    def summary(self):
+        """ Returns a one-line report of the lateness and injection time percentiles, in ms. """
+        rows = list(self.rows())
+        late = _percentiles(row[3] for row in rows)
+        inject = _percentiles(row[4] for row in rows)
+        return ('{} chords | lateness p50 {:.2f} / p95 {:.2f} / p99 {:.2f} ms'
+                ' | injection p50 {:.2f} / p95 {:.2f} / p99 {:.2f} ms').format(
+                    len(rows), *[value * 1000 for value in late + inject])
+
+    def dump_csv(self, filename):
+        with open(filename, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(self.FIELDS)
+            writer.writerows(self.rows())
+
+def play_timeline(timeline, should_stop, on_action=None, scheduler=None, recorder=None):
+    """
+    Dispatches the actions of a timeline at their absolute times, one chord
+    (all actions sharing a time) at once. `should_stop` is polled before each
+    chord. `on_action(index)` is called after each chord with the index of the
+    next action and may recompile the timeline from there. Every dispatch is
+    recorded in `recorder`, a `LatencyRecorder`, if one is given. Returns the
+    `Scheduler` used, for its lateness figures.
+
+    Shift and ctrl are kept held between chords that need them (see
+    `MODIFIER_HOLD_LIMIT`) and are always released before returning.
+    """
+    scheduler = scheduler or Scheduler()
+    sequencer = keyboard.ModifierSequencer()
+    scheduler.begin()
+    clock = scheduler.clock
+    start = scheduler.start
+    times = timeline.times
+    modifiers = timeline.modifiers
+    i = 0
+    try:
+        while i < len(timeline):
+            if should_stop(): break
+            action_time = times[i]
+            j = i + 1
+            while j < len(timeline) and times[j] == action_time:
+                j += 1
+            scheduler.wait_until(action_time)
+            if recorder is None:
+                held = press_chord(timeline.scan_codes[i:j], modifiers[i:j], sequencer)
+            else:
+                before = clock()
+                held = press_chord(timeline.scan_codes[i:j], modifiers[i:j], sequencer)
+                recorder.record(action_time, before - start, clock() - start, j - i)
+            if held:
+                # Let go now, rather than at the next deadline, unless the
+                # next chord is close and needs the same modifier.
+                k = j
+                while k < len(timeline) and times[k] == times[j]:
+                    k += 1
+                if (j == len(timeline) or times[j] - action_time > MODIFIER_HOLD_LIMIT
+                        or held not in modifiers[j:k]):
+                    sequencer.release_modifiers()
+            i = j
+            if on_action is not None:
+                on_action(i)
+    finally:
+        sequencer.release_modifiers()
+    return scheduler